@@ -1,21 +1,39 @@
 import json
-import shutil
-from pathlib import Path
+import secrets
 from datetime import datetime
 
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile, Request, Query
+from fastapi import APIRouter, BackgroundTasks, File, Form, Header, HTTPException, UploadFile, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Any, Optional
 
 from app.core.config import settings
+from app.core.logging_config import log_stage
 from app.models.schemas import (
     DeleteProjectResponse,
+    ImageSavingsResponse,
     ProjectListResponse,
     ProjectResponse,
+    ReconcileResponse,
     UploadResponse,
     VerificationResponse,
 )
 from app.services.email_service import send_verification_email
-from app.utils.file_utils import clean_temp_files, deploy_project, save_upload_file, validate_zip_file
+from app.services.image_service import IMAGE_MANIFEST
+from app.services.reconcile_service import (
+    acquire_reconcile_lease,
+    reconcile_running,
+    release_reconcile_lease,
+    run_reconcile,
+    scan_storage,
+)
+from app.utils.archive_utils import get_archive, supported_archives
+from app.utils.file_utils import (
+    clean_temp_files,
+    delete_project_files,
+    deploy_project,
+    save_and_validate_upload,
+)
+from app.utils.project_utils import load_project_manifest, load_project_meta, project_meta_exists, update_project_meta
 from app.utils.token_utils import (
     clean_expired_tokens,
     create_verification_token,
@@ -27,22 +45,18 @@ from app.utils.token_utils import (
 
 # 创建路由器
 router = APIRouter(tags=["projects"])
-project_meta_path = settings.DATA_DIR / "projects.json"
 
 @router.post("/upload/", response_model=UploadResponse)
 async def upload_project(
     file: UploadFile = File(...),
 ):
     """
-    上传项目ZIP文件
+    上传项目压缩包
     
-    - **file**: ZIP文件，必须包含meta.json文件，其中的project属性将作为项目名称
+    - **file**: ZIP、tar.gz或tar.zst文件，必须包含meta.json文件，其中的project属性将作为项目名称
     
     返回上传结果和验证令牌，并自动发送验证邮件
     """
-    # 清理过期的验证令牌
-    clean_expired_tokens()
-    
     # 检查文件大小
     content_length = file.size
     if content_length and content_length > settings.MAX_FILE_SIZE:
@@ -52,25 +66,26 @@ async def upload_project(
         )
     
     # 检查文件类型
-    if not file.filename or not file.filename.endswith(".zip"):
+    archive = get_archive(file.filename or "")
+    if archive is None:
         return UploadResponse(
             success=False,
-            message="只接受ZIP文件",
+            message=f"只接受{'、'.join(item.label for item in supported_archives())}",
         )
     
     try:
-        # 生成临时文件名
-        temp_filename = f"temp_{int(datetime.now().timestamp())}"
+        # 清理过期的验证令牌
+        await run_in_threadpool(clean_expired_tokens)
         
-        # 保存上传的文件
-        temp_file_path = await save_upload_file(file, temp_filename)
+        # 生成临时文件名，临时存储由所有工作进程和副本共享，附加随机部分避免同一秒内的上传互相覆盖
+        temp_filename = f"temp_{int(datetime.now().timestamp())}_{secrets.token_hex(8)}"
         
-        # 验证ZIP文件
-        is_valid, message, metadata = validate_zip_file(temp_file_path)
+        # 保存并验证上传的文件
+        temp_file_path, is_valid, message, metadata = await save_and_validate_upload(file, temp_filename, archive)
         
         if not is_valid:
             # 清理临时文件
-            clean_temp_files(temp_file_path)
+            await run_in_threadpool(clean_temp_files, temp_file_path)
             return UploadResponse(success=False, message=message)
         
         # 使用meta.json中的project字段作为项目名称
@@ -80,20 +95,21 @@ async def upload_project(
         verification_token = create_verification_token(project_name, temp_file_path)
         
         # 保存验证令牌
-        save_verification_token(verification_token)
+        await run_in_threadpool(save_verification_token, verification_token)
         
         # 更新令牌关联的邮箱
-        update_token_email(verification_token.token, metadata.email)
+        await run_in_threadpool(update_token_email, verification_token.token, metadata.email)
         
         # 直接发送验证邮件
-        success = await send_verification_email(
-            metadata.email,
-            verification_token.token,
-            project_name
-        )
+        with log_stage("email"):
+            success = await send_verification_email(
+                metadata.email,
+                verification_token.token,
+                project_name
+            )
         if not success:
             # 清理临时文件
-            clean_temp_files(temp_file_path)
+            await run_in_threadpool(clean_temp_files, temp_file_path)
             return UploadResponse(
                 success=False,
                 message="发送验证邮件失败，请稍后重试",
@@ -120,39 +136,40 @@ async def verify_project(token: str):
     
     返回验证结果和项目访问路径
     """
-    # 获取验证令牌
-    verification_token = get_verification_token(token)
-
-    if not verification_token:
-        return VerificationResponse(
-            success=False,
-            message="验证令牌不存在或已过期",
-            redirect_url=None
-        )
-
     try:
+        # 获取验证令牌
+        verification_token = await run_in_threadpool(get_verification_token, token)
+        
+        if not verification_token:
+            return VerificationResponse(
+                success=False,
+                message="验证令牌不存在或已过期",
+                redirect_url=None
+            )
+        
         # 部署项目
-        project_dir = deploy_project(
-            Path(verification_token.temp_path),
-            verification_token.project_name
-        )
+        with log_stage("deploy"):
+            await run_in_threadpool(
+                deploy_project,
+                verification_token.temp_path,
+                verification_token.project_name
+            )
 
         # 清理临时文件
-        clean_temp_files(Path(verification_token.temp_path))
+        await run_in_threadpool(clean_temp_files, verification_token.temp_path)
 
         # 移除验证令牌
-        remove_verification_token(token)
+        await run_in_threadpool(remove_verification_token, token)
 
         # 构建项目访问路径
         project_url = f"{settings.DOMAIN}/{verification_token.project_name}/"
 
 
-        if project_meta_path.exists():
-            project_meta_data = json.loads(project_meta_path.read_text(encoding="utf-8"))
-        else:
-            project_meta_data = {}
-        project_meta_data[verification_token.email] = verification_token.project_name
-        project_meta_path.write_text(json.dumps(project_meta_data, ensure_ascii=False, indent=4), encoding="utf-8")
+        def register(project_meta_data: Dict[str, str]) -> bool:
+            project_meta_data[verification_token.email] = verification_token.project_name
+            return True
+        
+        await run_in_threadpool(update_project_meta, register)
 
         return VerificationResponse(
             success=True,
@@ -187,11 +204,11 @@ async def get_projects(
     if not email:
         raise HTTPException(status_code=400, detail="缺少email参数")
 
-    if not project_meta_path.exists():
+    if not await run_in_threadpool(project_meta_exists):
         return {"projects": []}
     
     try:
-        project_meta_data = json.loads(project_meta_path.read_text(encoding="utf-8"))
+        project_meta_data = await run_in_threadpool(load_project_meta)
         projects = [
             {"name": name, "url": f"{settings.DOMAIN}/{name}/", "email": email_key}
             for email_key, name in project_meta_data.items()
@@ -201,6 +218,34 @@ async def get_projects(
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="项目元数据格式错误")
 
+@router.get("/project/images/", response_model=ImageSavingsResponse, summary="获取项目图片优化统计", description="返回项目部署时图片优化节省的字节数")
+async def get_project_image_savings(
+    name: str = Query(..., description="项目名称", example="my-project")
+):
+    """
+    获取项目图片优化统计
+    
+    ## 参数说明
+    - **name**: 项目名称
+    
+    ## 返回说明
+    - 图片数量、原始字节数、优化后字节数以及按最优格式（WebP/AVIF）提供时节省的字节数
+    
+    ## 错误码
+    - **404**: 项目不存在或部署时未启用图片优化
+    """
+    manifest = await run_in_threadpool(load_project_manifest, name, IMAGE_MANIFEST)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="未找到项目的图片优化记录")
+    
+    stats = manifest.get("stats", {})
+    return ImageSavingsResponse(
+        name=name,
+        variants=len(manifest.get("variants", {})),
+        saved_bytes=stats.get("original_bytes", 0) - stats.get("served_bytes", 0),
+        **stats,
+    )
+
 @router.delete("/project/", response_model=DeleteProjectResponse, summary="删除项目", description="删除用户已部署的项目，需要提供邮箱和项目名称")
 async def delete_project(
     email: str = Query(..., description="用户邮箱地址", example="user@example.com"),
@@ -224,21 +269,24 @@ async def delete_project(
     if not email or not name:
         raise HTTPException(status_code=400, detail="缺少email或name参数")
     
-    if not project_meta_path.exists():
+    if not await run_in_threadpool(project_meta_exists):
         raise HTTPException(status_code=404, detail="没有找到项目元数据")
     
     try:
-        project_meta_data = json.loads(project_meta_path.read_text(encoding="utf-8"))
+        project_meta_data = await run_in_threadpool(load_project_meta)
         
         if email in project_meta_data and project_meta_data[email] == name:
             # 删除项目目录
-            project_dir = settings.DATA_DIR / name
-            if project_dir.exists():
-                shutil.rmtree(project_dir)
+            await run_in_threadpool(delete_project_files, name)
             
             # 从元数据中删除项目记录
-            del project_meta_data[email]
-            project_meta_path.write_text(json.dumps(project_meta_data, ensure_ascii=False, indent=4), encoding="utf-8")
+            def unregister(project_meta_data: Dict[str, str]) -> bool:
+                if project_meta_data.get(email) != name:
+                    return False
+                del project_meta_data[email]
+                return True
+            
+            await run_in_threadpool(update_project_meta, unregister)
             
             return {"message": "项目删除成功"}
         else:
@@ -247,3 +295,46 @@ async def delete_project(
         raise HTTPException(status_code=500, detail="项目元数据格式错误")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"删除项目失败: {str(e)}")
+
+
+@router.post("/admin/reconcile/", response_model=ReconcileResponse, summary="回收孤立存储", description="对比数据目录、临时目录、项目元数据和令牌缓存，报告或回收孤立的文件")
+async def reconcile_storage(
+    background_tasks: BackgroundTasks,
+    dry_run: bool = Query(True, description="仅生成报告，不执行回收"),
+    x_admin_token: Optional[str] = Header(None, description="管理令牌"),
+):
+    """
+    回收孤立存储
+    
+    ## 参数说明
+    - **dry_run**: 为true时仅返回报告；为false时在后台按批次回收报告中的条目
+    - **X-Admin-Token**: 请求头，需与ADMIN_TOKEN配置一致
+    
+    ## 返回说明
+    - 孤立的项目目录、临时文件、失效令牌、丢失目录的元数据记录及可回收字节数
+    
+    ## 错误码
+    - **403**: 管理接口未启用或管理令牌错误
+    - **409**: 已有回收任务正在运行
+    """
+    if not settings.ADMIN_TOKEN or not secrets.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="无权访问管理接口")
+    
+    if dry_run:
+        if await run_in_threadpool(reconcile_running):
+            raise HTTPException(status_code=409, detail="已有回收任务正在运行")
+        return await run_in_threadpool(scan_storage)
+    
+    # 在返回前获取租约，租约保存在共享存储中，对所有工作进程和副本生效
+    owner = await run_in_threadpool(acquire_reconcile_lease)
+    if owner is None:
+        raise HTTPException(status_code=409, detail="已有回收任务正在运行")
+    
+    try:
+        report = await run_in_threadpool(scan_storage)
+    except BaseException:
+        await run_in_threadpool(release_reconcile_lease, owner)
+        raise
+    report.dry_run = False
+    background_tasks.add_task(run_reconcile, report, owner)
+    return report
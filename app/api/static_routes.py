@@ -0,0 +1,127 @@
+import mimetypes
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from app.services.image_service import IMAGE_MANIFEST, IMAGE_SUFFIXES, VARIANT_MEDIA_TYPES, negotiate_variant
+from app.services.preload_service import PRELOAD_MANIFEST, format_link_header
+from app.services.storage import DATA_AREA, get_storage
+from app.utils.project_utils import MANIFEST_DIR, load_project_manifest
+
+# 创建路由器，需在其他路由之后注册，避免覆盖API路径
+router = APIRouter(tags=["static"])
+
+
+class _EarlyHintsResponse(Response):
+    """
+    在最终响应之前发送103 Early Hints
+    
+    ASGI没有标准的Early Hints消息，这里使用Hypercorn等服务器提供的 http.response.early_hint 扩展；
+    服务器不支持时（如uvicorn）只发送最终响应，由其中的Link头完成预加载，反向代理也可据此生成103。
+    """
+
+    def __init__(self, response: Response, links: List[str]):
+        self.response = response
+        self.links = links
+        self.status_code = response.status_code
+        self.raw_headers = response.raw_headers
+        self.background = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if "http.response.early_hint" in scope.get("extensions", {}):
+            await send({
+                "type": "http.response.early_hint",
+                "links": [link.encode("latin-1") for link in self.links],
+            })
+        if self.background is not None and self.response.background is None:
+            self.response.background = self.background
+        await self.response(scope, receive, send)
+
+
+def _file_response(key: str, media_type: Optional[str], headers: Dict[str, str]) -> Response:
+    """
+    从存储中读取项目文件并构建响应
+    
+    Args:
+        key: 文件在数据存储中的键名
+        media_type: 响应的媒体类型，为None时根据文件名推断
+        headers: 额外的响应头
+    
+    Returns:
+        文件响应
+    """
+    storage = get_storage()
+    try:
+        local_path = storage.get_local_path(DATA_AREA, key)
+        # 本地存储直接发送文件（支持Range和条件请求）
+        content = storage.read_bytes(DATA_AREA, key) if local_path is None else None
+    except ValueError:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    
+    if local_path is not None:
+        if not local_path.is_file():
+            raise HTTPException(status_code=404, detail="文件不存在")
+        return FileResponse(local_path, media_type=media_type, headers=headers)
+    
+    if content is None:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    media_type = media_type or mimetypes.guess_type(key)[0] or "application/octet-stream"
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+@router.api_route("/{project_name}", methods=["GET", "HEAD"], include_in_schema=False)
+async def redirect_project(project_name: str):
+    """
+    项目根路径补全结尾的斜杠，保证页面中的相对路径正确解析
+    """
+    return RedirectResponse(url=f"/{project_name}/", status_code=301)
+
+
+@router.api_route("/{project_name}/{file_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_project_file(project_name: str, file_path: str, request: Request):
+    """
+    提供已部署项目的静态文件
+    
+    - 目录路径返回其中的index.html
+    - 图片存在WebP/AVIF副本时，根据Accept请求头返回客户端支持的最优格式
+    - HTML页面根据部署时生成的预加载清单发送Link预加载头，服务器支持时先发送103 Early Hints
+    """
+    if not file_path or file_path.endswith("/"):
+        file_path += "index.html"
+    
+    # 以 . 开头的项目名称和路径中的空段、. 段（如 /%2e/projects.json）会指向数据存储根目录下的
+    # 项目元数据或绕过下面的清单目录检查，一律视为不存在
+    segments = file_path.split("/")
+    if project_name.startswith(".") or any(segment in ("", ".", "..") for segment in segments):
+        raise HTTPException(status_code=404, detail="文件不存在")
+    
+    # 部署生成的项目清单不对外提供
+    if segments[0] == MANIFEST_DIR:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    
+    headers: Dict[str, str] = {}
+    media_type = None
+    if file_path.lower().endswith(IMAGE_SUFFIXES):
+        manifest = await run_in_threadpool(load_project_manifest, project_name, IMAGE_MANIFEST)
+        available = (manifest or {}).get("variants", {}).get(file_path)
+        if available:
+            headers["Vary"] = "Accept"
+            fmt = negotiate_variant(request.headers.get("accept", ""), available)
+            if fmt is not None:
+                file_path = f"{file_path}.{fmt}"
+                media_type = VARIANT_MEDIA_TYPES[fmt]
+    
+    # HTML入口页面附带关键子资源的预加载
+    links: List[str] = []
+    if file_path.lower().endswith((".html", ".htm")):
+        manifest = await run_in_threadpool(load_project_manifest, project_name, PRELOAD_MANIFEST)
+        links = [format_link_header(resource) for resource in (manifest or {}).get("pages", {}).get(file_path, [])]
+        if links:
+            headers["Link"] = ", ".join(links)
+    
+    response = await run_in_threadpool(_file_response, f"{project_name}/{file_path}", media_type, headers)
+    if links and response.status_code == 200:
+        return _EarlyHintsResponse(response, links)
+    return response
@@ -15,20 +15,69 @@ class Settings(BaseSettings):
     # 调试模式
     DEBUG: bool = False
     
+    # 日志设置
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000  # 日志队列容量，队列满时丢弃新日志而不是阻塞请求
+    LOG_RATE_LIMIT_SECONDS: float = 10.0  # 重复的警告/错误日志在该时间窗口内只输出一次
+    
     # 文件存储路径
     DATA_DIR: Path = Path("./data")
     DATA_TMP_DIR: Path = Path("./data-tmp")
     
+    # 存储后端：local 使用上面的本地目录，s3 使用S3兼容对象存储（多副本部署时必须使用s3）
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO等S3兼容服务的地址，使用AWS S3时留空
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_DATA_PREFIX: str = "data"
+    S3_TMP_PREFIX: str = "data-tmp"
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024  # 分片大小，S3要求除最后一片外不小于5MB
+    S3_MAX_CONCURRENCY: int = 8  # 部署时并行上传的对象数
+    
     # 域名设置
     DOMAIN: str = "http://localhost:8000"
     
+    # 生产启动设置（python -m app.core.server）
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 0  # 工作进程数，0表示使用全部可用CPU核心
+    KEEPALIVE_TIMEOUT: int = 75  # 空闲连接保持时间（秒），应大于前端负载均衡的空闲超时，避免复用已被服务端关闭的连接
+    BACKLOG: int = 2048  # 监听队列长度，实际上限受内核net.core.somaxconn限制
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = 30  # 关闭时等待进行中请求完成的最长时间（秒）
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"  # 信任其X-Forwarded-*请求头的反向代理地址，多个地址用逗号分隔
+    WARMUP_CONCURRENCY: int = 8  # 启动预热时并行读取项目清单的线程数
+    
     # 文件上传设置
     MAX_FILE_SIZE: int = 5 * 1024 * 1024  # 5MB
+    MAX_EXTRACTED_SIZE: int = 50 * 1024 * 1024  # 解压后的总大小上限，防止压缩炸弹
+    
+    # 部署时图片优化设置（需要安装可选依赖 Pillow）
+    IMAGE_OPTIMIZATION: bool = False  # 无损重新压缩PNG/JPEG，并生成WebP副本
+    IMAGE_AVIF: bool = False  # 额外生成有损AVIF副本（需要Pillow支持AVIF）
+    IMAGE_WEBP_QUALITY: int = 80  # JPEG生成WebP副本时的质量，PNG生成无损WebP
+    IMAGE_AVIF_QUALITY: int = 60
+    IMAGE_WORKERS: int = 2  # 图片处理进程数
+    IMAGE_TIME_BUDGET_SECONDS: float = 20.0  # 单次部署的图片处理时间预算，超时的图片保持原样
+    
+    # 部署时解析HTML入口页面生成预加载清单，访问页面时发送Link预加载头和103 Early Hints
+    PRELOAD_HINTS: bool = True
+    PRELOAD_MAX_LINKS: int = 16  # 每个页面最多预加载的资源数
     
     # 验证令牌设置
     VERIFICATION_CACHE_FILE: str = "verification_cache.json"
     VERIFICATION_EXPIRY_MINUTES: int = 10
     
+    # 管理接口设置，未配置令牌时管理接口不可用
+    ADMIN_TOKEN: Optional[str] = None
+    
+    # 存储回收设置
+    RECONCILE_GRACE_SECONDS: int = 15 * 60  # 新近修改的文件/目录不回收，避免与进行中的上传/部署冲突
+    RECONCILE_BATCH_SIZE: int = 10  # 每批回收的条目数
+    RECONCILE_BATCH_INTERVAL: float = 1.0  # 批次之间的间隔（秒），限制回收对服务I/O的影响
+    RECONCILE_LEASE_SECONDS: int = 300  # 回收租约时间（秒），每批续期，应远大于单个批次的耗时；任务异常退出后租约到期自动失效
+    
     # 邮件设置
     MAIL_USERNAME: Optional[str] = None
     MAIL_PASSWORD: Optional[str] = None
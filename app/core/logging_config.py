@@ -0,0 +1,218 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+# 当前请求ID与阶段耗时，由RequestContextMiddleware在每个请求开始时设置
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+stage_timings_var: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+# 不属于日志记录默认属性的字段会作为结构化字段输出
+# uvicorn的日志附带带颜色的color_message，JSON输出中不需要
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "color_message"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为单行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """在记录入队时附加请求ID（监听线程中无法读取请求的上下文变量）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    对重复的警告/错误日志限流
+
+    同一调用位置的WARNING及以上日志在时间窗口内只输出一次（按调用位置而不是消息内容判断，
+    使用f-string拼接的消息同样会被限流），窗口结束后的第一条记录会携带suppressed字段，
+    记录期间被丢弃的条数。
+    """
+
+    def __init__(self, window_seconds: float):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._seen: Dict[Tuple[str, int, str, int], Tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.window_seconds <= 0:
+            return True
+
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window_start, suppressed = self._seen.get(key, (0.0, 0))
+            if now - window_start < self.window_seconds:
+                self._seen[key] = (window_start, suppressed + 1)
+                return False
+            self._seen[key] = (now, 0)
+            # 避免调用位置过多时无限增长
+            if len(self._seen) > 1024:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window_seconds}
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """队列满时直接丢弃日志，保证请求处理不会因日志输出而阻塞"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 在入队前完成消息拼接和异常格式化，保留结构化字段供JsonFormatter使用
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # 丢弃计数只在记录成功入队后清零，队列仍满时继续累计
+        if self.dropped:
+            record.dropped = self.dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self.dropped = 0
+
+
+def setup_logging() -> None:
+    """
+    配置基于队列的日志：请求处理线程只负责入队，由后台监听线程输出JSON日志
+
+    重复调用是安全的，只会启动一个监听线程。
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT_SECONDS))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """停止监听线程，并输出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+@contextmanager
+def log_stage(name: str) -> Iterator[None]:
+    """
+    记录当前请求中某个处理阶段的耗时（毫秒），随请求日志一并输出
+
+    Args:
+        name: 阶段名称
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = stage_timings_var.get()
+        if timings is not None:
+            timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+class RequestContextMiddleware:
+    """
+    为每个请求分配请求ID并记录耗时
+
+    请求ID优先取自X-Request-ID请求头，并在响应头中返回。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = logging.getLogger("app.request")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        timings: Dict[str, float] = {}
+        request_id_token = request_id_var.set(request_id)
+        timings_token = stage_timings_var.set(timings)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.logger.info(
+                "请求完成",
+                extra={
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    "stages": dict(timings),
+                },
+            )
+            stage_timings_var.reset(timings_token)
+            request_id_var.reset(request_id_token)
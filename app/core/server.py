@@ -0,0 +1,79 @@
+import importlib.util
+import logging
+import os
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.logging_config import setup_logging
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+def _worker_count() -> int:
+    """
+    工作进程数，WORKERS为0时使用当前进程可用的CPU核心数
+
+    Returns:
+        工作进程数
+    """
+    if settings.WORKERS > 0:
+        return settings.WORKERS
+    return os.process_cpu_count() or 1
+
+
+def _implementation(module: str, fallback: str) -> str:
+    """
+    已安装时使用module对应的实现，否则回退到纯Python实现
+
+    Args:
+        module: 模块名称（uvloop、httptools）
+        fallback: 回退实现名称
+
+    Returns:
+        uvicorn的loop/http参数
+    """
+    if importlib.util.find_spec(module) is not None:
+        return module
+    logger.warning(f"未安装{module}，使用{fallback}实现: pip install 'share-project[server]'")
+    return fallback
+
+
+def main() -> None:
+    """
+    生产环境启动入口：多进程、无热重载
+
+    各工作进程在应用的lifespan中各自预热共享状态；收到SIGTERM/SIGINT后停止接受新连接，
+    在GRACEFUL_SHUTDOWN_TIMEOUT内等待进行中的请求完成后退出。
+    """
+    setup_logging()
+
+    workers = _worker_count()
+    loop = _implementation("uvloop", "asyncio")
+    http = _implementation("httptools", "h11")
+    logger.info(
+        f"启动服务: {settings.HOST}:{settings.PORT}, 工作进程 {workers} 个",
+        extra={"workers": workers, "loop": loop, "http": http},
+    )
+
+    uvicorn.run(
+        "main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.BACKLOG,
+        timeout_keep_alive=settings.KEEPALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        # 请求日志由RequestContextMiddleware输出，uvicorn自身的日志交给根日志器统一输出JSON
+        access_log=False,
+        log_config=None,
+    )
+
+
+if __name__ == "__main__":
+    main()
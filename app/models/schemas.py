@@ -9,7 +9,13 @@ class ProjectMetadata(BaseModel):
     
     author: str = Field(..., description="项目作者")
     email: EmailStr = Field(..., description="作者邮箱")
-    project: str = Field(..., description="项目名称，用于部署路径")
+    project: str = Field(
+        ...,
+        # 项目名称是部署路径和URL的第一段，只允许单个不以 . 开头的路径段
+        pattern=r"^[\w-][\w.-]*$",
+        max_length=100,
+        description="项目名称，用于部署路径",
+    )
     created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
 
 
@@ -40,7 +46,7 @@ class VerificationToken(BaseModel):
     
     token: str = Field(..., description="验证令牌")
     project_name: str = Field(..., description="项目名称")
-    temp_path: str = Field(..., description="临时文件路径")
+    temp_path: str = Field(..., description="临时文件在存储中的键名")
     created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
     expires_at: datetime = Field(..., description="过期时间")
     email: Optional[EmailStr] = Field(None, description="接收验证链接的邮箱")
@@ -63,4 +69,27 @@ class ProjectListResponse(BaseModel):
 class DeleteProjectResponse(BaseModel):
     """删除项目响应模型"""
     
-    message: str = Field(..., description="操作结果消息") 
\ No newline at end of file
+    message: str = Field(..., description="操作结果消息") 
+
+class ReconcileResponse(BaseModel):
+    """存储回收响应模型"""
+    
+    dry_run: bool = Field(..., description="是否仅生成报告而不执行回收")
+    orphan_projects: List[str] = Field(default_factory=list, description="未被项目元数据引用的项目目录")
+    orphan_temp_files: List[str] = Field(default_factory=list, description="未被验证令牌引用的临时文件")
+    stale_tokens: List[str] = Field(default_factory=list, description="临时文件已丢失或已过期的验证令牌")
+    dangling_entries: List[str] = Field(default_factory=list, description="项目目录已丢失的元数据记录（邮箱）")
+    reclaimable_bytes: int = Field(0, description="可回收的字节数")
+
+
+class ImageSavingsResponse(BaseModel):
+    """项目图片优化统计响应模型"""
+    
+    name: str = Field(..., description="项目名称")
+    images: int = Field(0, description="处理的图片数量")
+    skipped: int = Field(0, description="超时或处理失败而保持原样的图片数量")
+    variants: int = Field(0, description="生成了WebP/AVIF副本的图片数量")
+    original_bytes: int = Field(0, description="图片原始总字节数")
+    optimized_bytes: int = Field(0, description="无损优化后的图片总字节数")
+    served_bytes: int = Field(0, description="按最优格式提供时的图片总字节数")
+    saved_bytes: int = Field(0, description="按最优格式提供时节省的字节数")
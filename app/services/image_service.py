@@ -0,0 +1,281 @@
+import atexit
+import io
+import json
+import logging
+import multiprocessing
+import shutil
+import subprocess
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.project_utils import manifest_key
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 图片清单名称，记录每张图片可用的副本格式和节省的字节数
+IMAGE_MANIFEST = "images"
+
+VARIANT_MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def image_optimization_available() -> bool:
+    """
+    当前环境是否可以进行图片优化
+    
+    Returns:
+        是否已启用且安装了Pillow
+    """
+    if not settings.IMAGE_OPTIMIZATION:
+        return False
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    获取图片处理进程池（进程内单例）
+    
+    使用spawn方式创建子进程，避免在带有后台线程的服务进程中fork。
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=max(settings.IMAGE_WORKERS, 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        atexit.register(shutdown_image_pool)
+    return _pool
+
+
+def shutdown_image_pool() -> None:
+    """关闭图片处理进程池"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _recycle_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    终止进程池中的子进程并让后续部署使用新的进程池
+    
+    Future.cancel() 无法停止已经开始执行的任务，超时的图片会继续占用子进程，
+    导致下一次部署的图片排在它后面并耗尽时间预算，因此有任务超时时直接回收整个进程池。
+    同一进程池中其他部署尚未完成的任务会立即失败，这些图片保持原样。
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+    # Python 3.14+ 提供 terminate_workers，3.13 没有公开接口，只能直接终止子进程
+    terminate_workers = getattr(pool, "terminate_workers", None)
+    if terminate_workers is not None:
+        terminate_workers()
+        return
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def _optimize_jpeg(data: bytes) -> Optional[bytes]:
+    """
+    使用jpegtran无损优化JPEG（重建Huffman表并转为渐进式），未安装jpegtran时返回None
+    
+    Pillow只能解码后重新编码，无法做到无损，因此JPEG原图只在有jpegtran时才会被替换。
+    """
+    jpegtran = shutil.which("jpegtran")
+    if jpegtran is None:
+        return None
+    result = subprocess.run(
+        [jpegtran, "-copy", "all", "-optimize", "-progressive"],
+        input=data,
+        capture_output=True,
+        timeout=30,
+    )
+    return result.stdout if result.returncode == 0 and result.stdout else None
+
+
+def process_image(
+    name: str,
+    data: bytes,
+    avif: bool,
+    webp_quality: int,
+    avif_quality: int
+) -> Tuple[Optional[bytes], Dict[str, bytes]]:
+    """
+    在子进程中处理单张图片
+    
+    Args:
+        name: 图片在项目中的相对路径
+        data: 图片内容
+        avif: 是否生成AVIF副本
+        webp_quality: 有损WebP的质量
+        avif_quality: 有损AVIF的质量
+    
+    Returns:
+        (无损优化后的原图，未变小时为None, {副本格式: 副本内容})，只保留比原图更小的副本
+    """
+    from PIL import Image
+    
+    is_png = name.lower().endswith(".png")
+    # 16位PNG会被Pillow截断为8位，无法无损处理，保持原样
+    if is_png and len(data) > 24 and data[24] == 16:
+        return None, {}
+    
+    with Image.open(io.BytesIO(data)) as image:
+        # 动图的多帧处理成本高且收益不稳定，保持原样
+        if getattr(image, "is_animated", False):
+            return None, {}
+        image.load()
+        
+        # 保留EXIF（方向等）和ICC色彩配置，否则手机照片会显示为旋转后的方向、颜色也会偏移
+        exif = image.info.get("exif")
+        icc_profile = image.info.get("icc_profile")
+        
+        optimized = None
+        if is_png:
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG", optimize=True, icc_profile=icc_profile, exif=exif)
+            optimized = buffer.getvalue()
+        else:
+            optimized = _optimize_jpeg(data)
+        if optimized is not None and len(optimized) >= len(data):
+            optimized = None
+        baseline = len(optimized) if optimized is not None else len(data)
+        
+        # WebP/AVIF只支持RGB(A)，CMYK、调色板等模式先转换
+        # 转换不做色彩管理，CMYK、灰度等模式的ICC配置不适用于转换后的RGB数据，只有RGB系的配置可以沿用
+        source = image
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = "A" in image.getbands() or "transparency" in image.info
+            source = image.convert("RGBA" if has_alpha else "RGB")
+            if image.mode not in ("P", "PA"):
+                icc_profile = None
+        metadata = {key: value for key, value in (("exif", exif), ("icc_profile", icc_profile)) if value}
+        
+        variants = {}
+        buffer = io.BytesIO()
+        if is_png:
+            source.save(buffer, format="WEBP", lossless=True, method=4, **metadata)
+        else:
+            source.save(buffer, format="WEBP", quality=webp_quality, method=4, **metadata)
+        variants["webp"] = buffer.getvalue()
+        
+        if avif:
+            Image.init()
+            if "AVIF" in Image.SAVE:
+                buffer = io.BytesIO()
+                source.save(buffer, format="AVIF", quality=avif_quality, **metadata)
+                variants["avif"] = buffer.getvalue()
+    
+    return optimized, {fmt: content for fmt, content in variants.items() if len(content) < baseline}
+
+
+def optimize_project_images(files: Iterable[Tuple[str, bytes]], project_name: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    部署流水线中的图片处理阶段
+    
+    非图片文件直接透传；PNG/JPEG提交到进程池处理，在时间预算内完成的图片替换为优化后的版本并生成
+    同目录下的副本（如 logo.png.webp），超时或处理失败的图片保持原样。最后写入图片清单。
+    
+    Args:
+        files: (相对路径, 内容) 迭代器
+        project_name: 项目名称，用于日志
+    
+    Returns:
+        (相对路径, 内容) 迭代器
+    """
+    if not image_optimization_available():
+        yield from files
+        return
+    
+    pool = _get_pool()
+    deadline = time.monotonic() + settings.IMAGE_TIME_BUDGET_SECONDS
+    pending: List[Tuple[str, bytes, Future]] = []
+    for name, data in files:
+        if name.lower().endswith(IMAGE_SUFFIXES):
+            future = pool.submit(
+                process_image,
+                name,
+                data,
+                settings.IMAGE_AVIF,
+                settings.IMAGE_WEBP_QUALITY,
+                settings.IMAGE_AVIF_QUALITY,
+            )
+            pending.append((name, data, future))
+        else:
+            yield name, data
+    
+    variants: Dict[str, List[str]] = {}
+    stats = {"images": len(pending), "skipped": 0, "original_bytes": 0, "optimized_bytes": 0, "served_bytes": 0}
+    timed_out = False
+    for name, data, future in pending:
+        try:
+            optimized, image_variants = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            timed_out = True
+            optimized, image_variants = None, {}
+            stats["skipped"] += 1
+        except Exception:
+            logger.warning(f"图片处理失败: {project_name}/{name}", exc_info=True)
+            optimized, image_variants = None, {}
+            stats["skipped"] += 1
+        
+        content = optimized if optimized is not None else data
+        yield name, content
+        for fmt, variant in image_variants.items():
+            yield f"{name}.{fmt}", variant
+        if image_variants:
+            # 按副本大小排列，协商时返回客户端支持的最小副本（有损AVIF不一定比无损WebP小）
+            variants[name] = sorted(image_variants, key=lambda fmt: len(image_variants[fmt]))
+        
+        stats["original_bytes"] += len(data)
+        stats["optimized_bytes"] += len(content)
+        stats["served_bytes"] += min([len(content)] + [len(variant) for variant in image_variants.values()])
+    
+    if timed_out:
+        _recycle_pool(pool)
+    
+    manifest = {"variants": variants, "stats": stats}
+    yield manifest_key(IMAGE_MANIFEST), json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+    
+    logger.info(f"图片优化完成: {project_name}", extra={"project": project_name, "image_stats": stats})
+
+
+def negotiate_variant(accept: str, available: List[str]) -> Optional[str]:
+    """
+    根据Accept请求头选择图片副本格式
+    
+    Args:
+        accept: Accept请求头
+        available: 图片可用的副本格式，按副本大小从小到大排列
+    
+    Returns:
+        客户端支持的第一个副本格式，客户端不支持任何副本时返回None
+    """
+    accepted = set()
+    for item in accept.lower().split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        # 明确声明q=0（含q=0.00等写法）的格式视为不接受，无法解析的q值按接受处理
+        quality = next((param[2:] for param in (param.replace(" ", "") for param in params) if param.startswith("q=")), "1")
+        try:
+            if float(quality) <= 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(media_type)
+    for fmt in available:
+        if VARIANT_MEDIA_TYPES.get(fmt) in accepted:
+            return fmt
+    return None
@@ -0,0 +1,217 @@
+import json
+import logging
+import posixpath
+import re
+from html.parser import HTMLParser
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+from app.core.config import settings
+from app.utils.project_utils import manifest_key
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 预加载清单名称，记录每个HTML入口页面的关键子资源
+PRELOAD_MANIFEST = "preload"
+
+# 只解析不超过该大小的HTML/CSS文件
+_MAX_PARSE_SIZE = 1024 * 1024
+
+_FONT_TYPES = {".woff2": "font/woff2", ".woff": "font/woff", ".ttf": "font/ttf", ".otf": "font/otf"}
+_FONT_FACE_RE = re.compile(r"@font-face\s*{([^}]*)}", re.IGNORECASE)
+_CSS_URL_RE = re.compile(r"url\(\s*['\"]?([^'\")]+)['\"]?\s*\)", re.IGNORECASE)
+
+# 页面中声明的预加载属性会原样写入响应头，只接受合法取值
+_PRELOAD_AS = {"audio", "document", "fetch", "font", "image", "script", "style", "track", "video", "worker"}
+_MEDIA_TYPE_RE = re.compile(r"^[\w.+-]+/[\w.+-]+$", re.ASCII)
+
+# URL中保留原样的字符：已有的 %XX 编码和URL语法字符；非ASCII字符、控制字符、空白和 <> 会被百分号编码，
+# 保证Link头可以按latin-1编码发送，且不会破坏Link头语法
+_LINK_URL_SAFE = "!#$%&'()*+,/:;=?@[]~"
+
+
+class _SubresourceParser(HTMLParser):
+    """收集HTML中会阻塞渲染或尽早需要的子资源：样式表、head中的同步/模块脚本和已声明的预加载"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_head = True
+        self.resources: List[dict] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = {name: value or "" for name, value in attrs}
+        if tag == "body":
+            self.in_head = False
+        elif tag == "link":
+            rel = attributes.get("rel", "").lower().split()
+            href = attributes.get("href")
+            if not href:
+                return
+            if "stylesheet" in rel:
+                self.resources.append({"href": href, "as": "style"})
+            elif "modulepreload" in rel:
+                self.resources.append({"href": href, "rel": "modulepreload"})
+            elif "preload" in rel and attributes.get("as", "").lower() in _PRELOAD_AS:
+                resource = {"href": href, "as": attributes["as"].lower()}
+                if _MEDIA_TYPE_RE.match(attributes.get("type", "")):
+                    resource["type"] = attributes["type"]
+                if "crossorigin" in attributes:
+                    resource["crossorigin"] = True
+                self.resources.append(resource)
+        elif tag == "script" and self.in_head:
+            src = attributes.get("src")
+            if not src or "async" in attributes:
+                return
+            if attributes.get("type", "").lower() == "module":
+                self.resources.append({"href": src, "rel": "modulepreload"})
+            else:
+                self.resources.append({"href": src, "as": "script"})
+
+
+def _resolve(base_dir: str, url: str) -> Optional[Tuple[str, str]]:
+    """
+    将页面中的相对地址解析为项目内的相对路径，外部地址、站点根路径和data URI返回None
+    
+    Args:
+        base_dir: 页面所在目录（项目内相对路径）
+        url: 页面中的地址
+    
+    Returns:
+        (项目内的相对路径, 查询串)，无法解析时返回None
+    """
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path or parts.path.startswith("/"):
+        return None
+    path = posixpath.normpath(posixpath.join(base_dir, unquote(parts.path)))
+    if path.startswith("../") or path == "..":
+        return None
+    return path, parts.query
+
+
+def _font_resources(css: str, css_path: str) -> List[dict]:
+    """
+    从CSS的@font-face中提取字体文件，每个@font-face只取第一个可识别的字体地址（通常是woff2）
+    
+    Args:
+        css: CSS内容
+        css_path: CSS文件在项目内的相对路径
+    
+    Returns:
+        字体资源列表
+    """
+    fonts = []
+    for block in _FONT_FACE_RE.findall(css):
+        for url in _CSS_URL_RE.findall(block):
+            resolved = _resolve(posixpath.dirname(css_path), url.strip())
+            if resolved is None:
+                continue
+            font_type = _FONT_TYPES.get(posixpath.splitext(resolved[0])[1].lower())
+            if font_type:
+                fonts.append({"target": resolved, "as": "font", "type": font_type, "crossorigin": True})
+                break
+    return fonts
+
+
+def build_preload_manifest(pages: Dict[str, bytes], stylesheets: Dict[str, bytes], project_name: str) -> dict:
+    """
+    根据HTML入口页面生成预加载清单
+    
+    Args:
+        pages: {HTML相对路径: 内容}
+        stylesheets: {CSS相对路径: 内容}，用于提取字体
+        project_name: 项目名称，用于生成站点内的绝对地址
+    
+    Returns:
+        清单内容 {"pages": {HTML相对路径: [资源, ...]}}
+    """
+    manifest: Dict[str, List[dict]] = {}
+    for page_path, content in pages.items():
+        parser = _SubresourceParser()
+        try:
+            parser.feed(content.decode("utf-8", errors="replace"))
+            parser.close()
+        except Exception:
+            logger.warning(f"解析HTML失败: {project_name}/{page_path}", exc_info=True)
+            continue
+        
+        links: List[dict] = []
+        seen = set()
+        base_dir = posixpath.dirname(page_path)
+        for resource in parser.resources:
+            resolved = _resolve(base_dir, resource.pop("href").strip())
+            if resolved is None:
+                continue
+            resource["target"] = resolved
+            candidates = [resource]
+            path = resolved[0]
+            if resource.get("as") == "style" and path in stylesheets:
+                candidates += _font_resources(stylesheets[path].decode("utf-8", errors="replace"), path)
+            for candidate in candidates:
+                target = candidate.pop("target")
+                if target in seen:
+                    continue
+                seen.add(target)
+                # 保留查询串（已是页面中编码后的形式，不再重复编码），保证与页面实际请求的地址一致，避免重复下载
+                href = quote(f"/{project_name}/{target[0]}")
+                if target[1]:
+                    href += "?" + quote(target[1], safe=_LINK_URL_SAFE)
+                candidate["href"] = href
+                links.append(candidate)
+        
+        if links:
+            manifest[page_path] = links[:settings.PRELOAD_MAX_LINKS]
+    return {"pages": manifest}
+
+
+def collect_preload_manifest(files: Iterable[Tuple[str, bytes]], project_name: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    部署流水线中的预加载清单阶段，透传所有文件，同时收集HTML和CSS，最后写入预加载清单
+    
+    每次部署都会重新生成清单。
+    
+    Args:
+        files: (相对路径, 内容) 迭代器
+        project_name: 项目名称
+    
+    Returns:
+        (相对路径, 内容) 迭代器
+    """
+    if not settings.PRELOAD_HINTS:
+        yield from files
+        return
+    
+    pages: Dict[str, bytes] = {}
+    stylesheets: Dict[str, bytes] = {}
+    for name, data in files:
+        lower_name = name.lower()
+        if len(data) <= _MAX_PARSE_SIZE:
+            if lower_name.endswith((".html", ".htm")):
+                pages[name] = data
+            elif lower_name.endswith(".css"):
+                stylesheets[name] = data
+        yield name, data
+    
+    manifest = build_preload_manifest(pages, stylesheets, project_name)
+    yield manifest_key(PRELOAD_MANIFEST), json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+
+
+def format_link_header(resource: dict) -> str:
+    """
+    将清单中的资源格式化为Link头的一项
+    
+    Args:
+        resource: 清单中的资源
+    
+    Returns:
+        形如 </proj/style.css>; rel=preload; as=style 的字符串
+    """
+    # 旧版本生成的清单中查询串可能含有非ASCII字符，输出前再编码一次（已编码的部分保持不变）
+    parts = [f"<{quote(resource['href'], safe=_LINK_URL_SAFE)}>", f"rel={resource.get('rel', 'preload')}"]
+    if resource.get("as"):
+        parts.append(f"as={resource['as']}")
+    if resource.get("type"):
+        parts.append(f'type="{resource["type"]}"')
+    if resource.get("crossorigin"):
+        parts.append("crossorigin")
+    return "; ".join(parts)
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.models.schemas import ReconcileResponse
+from app.services.storage import DATA_AREA, TMP_AREA, StorageEntry, get_storage
+from app.utils.project_utils import load_project_meta, project_meta_exists, update_project_meta
+from app.utils.token_utils import load_verification_tokens, remove_verification_token
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 回收租约，保存在共享存储中，保证所有工作进程和副本中同一时间只有一个回收任务运行
+RECONCILE_LEASE_KEY = ".reconcile_lease.json"
+
+
+def _lease_holder(content: Optional[bytes], now: float) -> Optional[str]:
+    """
+    解析租约内容，返回未过期租约的持有者
+    
+    Args:
+        content: 租约对象内容
+        now: 当前时间戳
+    
+    Returns:
+        持有者标识，没有有效租约时返回None
+    """
+    if not content:
+        return None
+    try:
+        lease = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    if not lease.get("owner") or float(lease.get("expires_at", 0)) <= now:
+        return None
+    return lease["owner"]
+
+
+def _write_lease(owner: Optional[str], expires_at: float) -> bytes:
+    return json.dumps({"owner": owner, "expires_at": expires_at}).encode("utf-8")
+
+
+def acquire_reconcile_lease() -> Optional[str]:
+    """
+    获取回收租约
+    
+    Returns:
+        租约持有者标识，已有未过期的租约时返回None
+    """
+    owner = uuid.uuid4().hex
+    
+    def acquire(content: Optional[bytes]) -> Optional[bytes]:
+        now = time.time()
+        if _lease_holder(content, now) is not None:
+            return None
+        return _write_lease(owner, now + settings.RECONCILE_LEASE_SECONDS)
+    
+    content = get_storage().update_bytes(TMP_AREA, RECONCILE_LEASE_KEY, acquire)
+    return owner if _lease_holder(content, time.time()) == owner else None
+
+
+def renew_reconcile_lease(owner: str) -> bool:
+    """
+    续期回收租约
+    
+    Args:
+        owner: acquire_reconcile_lease返回的持有者标识
+    
+    Returns:
+        是否仍持有租约（租约已过期并被其他任务获取时返回False）
+    """
+    def renew(content: Optional[bytes]) -> Optional[bytes]:
+        now = time.time()
+        if _lease_holder(content, now) != owner:
+            return None
+        return _write_lease(owner, now + settings.RECONCILE_LEASE_SECONDS)
+    
+    content = get_storage().update_bytes(TMP_AREA, RECONCILE_LEASE_KEY, renew)
+    return _lease_holder(content, time.time()) == owner
+
+
+def release_reconcile_lease(owner: str) -> None:
+    """
+    释放回收租约，租约已被其他任务持有时不做修改
+    
+    Args:
+        owner: acquire_reconcile_lease返回的持有者标识
+    """
+    def release(content: Optional[bytes]) -> Optional[bytes]:
+        if _lease_holder(content, time.time()) != owner:
+            return None
+        return _write_lease(None, 0)
+    
+    get_storage().update_bytes(TMP_AREA, RECONCILE_LEASE_KEY, release)
+
+
+def reconcile_running() -> bool:
+    """
+    检查是否有回收任务持有未过期的租约
+    
+    Returns:
+        是否有回收任务正在运行
+    """
+    content = get_storage().read_bytes(TMP_AREA, RECONCILE_LEASE_KEY)
+    return _lease_holder(content, time.time()) is not None
+
+
+def _is_settled(entry: StorageEntry, now: float) -> bool:
+    """
+    判断条目是否已超过回收宽限期，避免误删进行中的上传或部署
+    
+    Args:
+        entry: 存储条目
+        now: 当前时间戳
+    
+    Returns:
+        是否可以回收
+    """
+    return now - entry.modified >= settings.RECONCILE_GRACE_SECONDS
+
+
+def _settled_names(area: str) -> Set[str]:
+    """
+    重新列出存储区域，返回仍存在且已超过回收宽限期的条目名称
+    
+    扫描之后被重新部署或重新上传的条目修改时间会更新，不会出现在结果中。
+    
+    Args:
+        area: 存储区域
+    
+    Returns:
+        可以回收的条目名称集合
+    """
+    now = time.time()
+    return {entry.name for entry in get_storage().list_entries(area) if _is_settled(entry, now)}
+
+
+def _referenced_names() -> Tuple[Set[str], Set[str]]:
+    """
+    读取当前被引用的项目名称和临时文件名
+    
+    Returns:
+        (项目元数据引用的项目名称集合, 有效令牌引用的临时文件名集合)
+    """
+    projects = set(load_project_meta().values())
+    current_time = datetime.now()
+    temp_names = set()
+    for token_data in load_verification_tokens().values():
+        if datetime.fromisoformat(str(token_data["expires_at"])) > current_time:
+            temp_names.add(Path(token_data["temp_path"]).name)
+    return projects, temp_names
+
+
+def scan_storage() -> ReconcileResponse:
+    """
+    对比数据存储、临时存储、项目元数据和令牌缓存，找出需要回收的条目
+    
+    Returns:
+        回收报告（dry_run=True）
+    """
+    storage = get_storage()
+    now = time.time()
+    current_time = datetime.now()
+    project_meta_data = load_project_meta()
+    tokens = load_verification_tokens()
+    temp_entries = storage.list_entries(TMP_AREA)
+    data_entries = storage.list_entries(DATA_AREA)
+    
+    # 已过期或临时文件丢失的令牌
+    existing_temp_names = {entry.name for entry in temp_entries}
+    stale_tokens = []
+    live_temp_names = set()
+    for token, token_data in tokens.items():
+        temp_name = Path(token_data["temp_path"]).name
+        expires_at = datetime.fromisoformat(str(token_data["expires_at"]))
+        if expires_at <= current_time or temp_name not in existing_temp_names:
+            stale_tokens.append(token)
+        else:
+            live_temp_names.add(temp_name)
+    
+    # 未被有效令牌引用的临时文件
+    orphan_temp_files = [
+        entry.name
+        for entry in temp_entries
+        if entry.name != settings.VERIFICATION_CACHE_FILE
+        and entry.name not in live_temp_names
+        and _is_settled(entry, now)
+    ]
+    
+    # 未被项目元数据引用的项目目录（如同一邮箱重复部署后遗留的旧项目、部署失败的残留目录）
+    referenced_projects = set(project_meta_data.values())
+    orphan_projects = [
+        entry.name
+        for entry in data_entries
+        if entry.is_dir and entry.name not in referenced_projects and _is_settled(entry, now)
+    ]
+    
+    # 项目目录已丢失的元数据记录
+    existing_projects = {entry.name for entry in data_entries if entry.is_dir}
+    dangling_entries = [
+        email
+        for email, name in project_meta_data.items()
+        if name not in existing_projects
+    ]
+    
+    reclaimable_bytes = sum(storage.entry_size(TMP_AREA, name) for name in orphan_temp_files)
+    reclaimable_bytes += sum(storage.entry_size(DATA_AREA, name) for name in orphan_projects)
+    
+    return ReconcileResponse(
+        dry_run=True,
+        orphan_projects=orphan_projects,
+        orphan_temp_files=orphan_temp_files,
+        stale_tokens=stale_tokens,
+        dangling_entries=dangling_entries,
+        reclaimable_bytes=reclaimable_bytes,
+    )
+
+
+async def reclaim_storage(report: ReconcileResponse, owner: str) -> int:
+    """
+    按批次回收报告中的条目，批次之间休眠以限制对服务I/O的影响
+    
+    每个批次开始前会续期回收租约，并重新读取引用关系和条目的修改时间，跳过在扫描之后又被引用
+    或被修改的条目（如孤立项目在登记元数据之前被重新部署）；租约丢失时（如任务停顿超过租约时间，其他任务已开始回收）立即停止。
+    
+    Args:
+        report: scan_storage生成的回收报告
+        owner: 回收租约的持有者标识
+    
+    Returns:
+        实际回收的条目数
+    """
+    storage = get_storage()
+    candidates: List[Tuple[str, str]] = [(TMP_AREA, name) for name in report.orphan_temp_files]
+    candidates += [(DATA_AREA, name) for name in report.orphan_projects]
+    
+    reclaimed = 0
+    batch_size = max(settings.RECONCILE_BATCH_SIZE, 1)
+    for start in range(0, len(candidates), batch_size):
+        if start:
+            await asyncio.sleep(settings.RECONCILE_BATCH_INTERVAL)
+        
+        if not await asyncio.to_thread(renew_reconcile_lease, owner):
+            logger.warning("回收租约已丢失，停止本次回收")
+            return reclaimed
+        
+        referenced_projects, referenced_temp_names = await asyncio.to_thread(_referenced_names)
+        batch = candidates[start:start + batch_size]
+        settled: Dict[str, Set[str]] = {}
+        for area, _ in batch:
+            if area not in settled:
+                settled[area] = await asyncio.to_thread(_settled_names, area)
+        for area, name in batch:
+            if name not in settled[area]:
+                continue
+            if area == TMP_AREA:
+                if name in referenced_temp_names:
+                    continue
+                await asyncio.to_thread(storage.delete, TMP_AREA, name)
+            else:
+                if name in referenced_projects:
+                    continue
+                await asyncio.to_thread(storage.delete_tree, DATA_AREA, name)
+            reclaimed += 1
+    
+    if not await asyncio.to_thread(renew_reconcile_lease, owner):
+        logger.warning("回收租约已丢失，停止本次回收")
+        return reclaimed
+    
+    # 清理令牌缓存中的失效令牌
+    for token in report.stale_tokens:
+        await asyncio.to_thread(remove_verification_token, token)
+    
+    # 清理项目目录已丢失的元数据记录，在原子更新中重新检查以避免删除并发部署刚登记的记录
+    if report.dangling_entries and await asyncio.to_thread(project_meta_exists):
+        await asyncio.to_thread(_remove_dangling_entries, report.dangling_entries)
+    
+    return reclaimed
+
+
+def _remove_dangling_entries(emails: List[str]) -> None:
+    """
+    从项目元数据中删除项目目录仍然不存在的记录
+    
+    Args:
+        emails: 待删除记录的邮箱列表
+    """
+    def remove_dangling(project_meta_data: Dict[str, str]) -> bool:
+        # 部署先写入项目目录再登记元数据，在更新内部列出目录才能看到已登记项目的目录
+        existing_projects = {entry.name for entry in get_storage().list_entries(DATA_AREA) if entry.is_dir}
+        changed = False
+        for email in emails:
+            name = project_meta_data.get(email)
+            if name is not None and name not in existing_projects:
+                del project_meta_data[email]
+                changed = True
+        return changed
+    
+    update_project_meta(remove_dangling)
+
+
+async def run_reconcile(report: ReconcileResponse, owner: str) -> None:
+    """
+    执行一次存储回收，供后台任务调用，结束后释放回收租约
+    
+    Args:
+        report: scan_storage生成的回收报告
+        owner: 调用方已获取的回收租约的持有者标识
+    """
+    try:
+        reclaimed = await reclaim_storage(report, owner)
+        logger.info(
+            f"存储回收完成: 回收 {reclaimed} 个条目, 约 {report.reclaimable_bytes} 字节, "
+            f"清理令牌 {len(report.stale_tokens)} 个, 清理元数据记录 {len(report.dangling_entries)} 条"
+        )
+    finally:
+        await asyncio.to_thread(release_reconcile_lease, owner)
@@ -0,0 +1,54 @@
+import json
+import logging
+import mimetypes
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.services.image_service import IMAGE_MANIFEST
+from app.services.preload_service import PRELOAD_MANIFEST
+from app.services.storage import get_storage
+from app.utils.archive_utils import supported_archives
+from app.utils.project_utils import load_project_manifest, load_project_meta
+from app.utils.token_utils import load_verification_tokens
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+def warm_up() -> None:
+    """
+    服务启动时预热，由应用的lifespan在每个工作进程中执行一次
+
+    - 创建存储后端（S3存储会建立客户端和连接池），之后的请求复用同一个客户端；配置错误时直接启动失败
+    - 读取项目元数据和令牌缓存，仅用于启动时检查存储可读，两者每次请求都会重新读取，不做缓存
+    - 为已登记的项目加载图片和预加载清单缓存，缓存按清单版本校验，其他进程或副本重新部署后
+      会在下次读取时自动失效，第一批页面请求不需要逐个读取和解析清单
+    - 初始化媒体类型表和可用的压缩包格式
+
+    除存储后端配置错误外，预热失败只记录警告，不影响服务启动。
+    """
+    started = time.perf_counter()
+    get_storage()
+
+    projects = []
+    tokens = 0
+    try:
+        projects = sorted(set(load_project_meta().values()))
+        tokens = len(load_verification_tokens())
+
+        manifests = [(project, name) for project in projects for name in (IMAGE_MANIFEST, PRELOAD_MANIFEST)]
+        with ThreadPoolExecutor(max_workers=max(settings.WARMUP_CONCURRENCY, 1)) as executor:
+            list(executor.map(lambda item: load_project_manifest(*item), manifests))
+    except json.JSONDecodeError:
+        logger.warning("项目元数据格式错误，跳过清单预热")
+    except Exception:
+        logger.warning("预热共享状态失败", exc_info=True)
+
+    mimetypes.init()
+    supported_archives()
+
+    logger.info(
+        f"预热完成: 项目 {len(projects)} 个, 待验证令牌 {tokens} 个",
+        extra={"duration_ms": round((time.perf_counter() - started) * 1000, 1)},
+    )
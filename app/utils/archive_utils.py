@@ -0,0 +1,168 @@
+import tarfile
+import zipfile
+from abc import ABC, abstractmethod
+from pathlib import PurePosixPath
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+def safe_member_name(name: str) -> Optional[str]:
+    """
+    规范化压缩包成员路径，去除绝对路径和 .. 等可能逃逸出项目目录的部分（与zipfile.extractall的处理一致）
+    
+    Args:
+        name: 压缩包中的成员路径
+    
+    Returns:
+        规范化后的相对路径，无有效部分时返回None
+    """
+    parts = [part for part in PurePosixPath(name.replace("\\", "/")).parts if part not in ("", ".", "..", "/")]
+    return "/".join(parts) or None
+
+
+class Archive(ABC):
+    """压缩包格式接口"""
+    
+    # 文件扩展名
+    suffix: str = ""
+    # 用于提示消息的格式名称
+    label: str = ""
+    # 是否支持从只读流中顺序读取（不需要随机访问和完整的临时文件）
+    streaming: bool = True
+
+    def available(self) -> bool:
+        """当前环境是否支持该格式"""
+        return True
+
+    @abstractmethod
+    def iter_members(self, fileobj: BinaryIO) -> Iterator[Tuple[str, BinaryIO]]:
+        """
+        按顺序遍历压缩包中的普通文件
+        
+        流式格式下，每个成员的文件对象只在迭代到下一个成员之前有效。
+        
+        Raises:
+            ValueError: 压缩包格式无效或解压后总大小超过MAX_EXTRACTED_SIZE
+        """
+
+
+class ZipArchive(Archive):
+    """ZIP格式，需要随机访问文件末尾的中央目录"""
+    
+    suffix = ".zip"
+    label = "ZIP文件"
+    streaming = False
+
+    def iter_members(self, fileobj: BinaryIO) -> Iterator[Tuple[str, BinaryIO]]:
+        try:
+            zip_ref = zipfile.ZipFile(fileobj, "r")
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"上传的文件不是有效的{self.label}") from e
+        
+        with zip_ref:
+            infos = [info for info in zip_ref.infolist() if not info.is_dir()]
+            if sum(info.file_size for info in infos) > settings.MAX_EXTRACTED_SIZE:
+                raise ValueError(f"解压后的文件大小超过限制，最大允许{settings.MAX_EXTRACTED_SIZE / 1024 / 1024}MB")
+            for info in infos:
+                name = safe_member_name(info.filename)
+                if name:
+                    with zip_ref.open(info) as member:
+                        yield name, member
+
+
+class TarArchive(Archive):
+    """tar格式的公共实现，子类负责提供解压后的tar字节流"""
+
+    @abstractmethod
+    def open_stream(self, fileobj: BinaryIO) -> BinaryIO:
+        """将压缩数据流包装为解压后的tar数据流"""
+
+    def iter_members(self, fileobj: BinaryIO) -> Iterator[Tuple[str, BinaryIO]]:
+        total_size = 0
+        try:
+            with tarfile.open(fileobj=self.open_stream(fileobj), mode="r|") as tar_ref:
+                for member in tar_ref:
+                    # 只处理普通文件，忽略目录、链接和设备文件
+                    if not member.isfile():
+                        continue
+                    total_size += member.size
+                    if total_size > settings.MAX_EXTRACTED_SIZE:
+                        raise ValueError(f"解压后的文件大小超过限制，最大允许{settings.MAX_EXTRACTED_SIZE / 1024 / 1024}MB")
+                    name = safe_member_name(member.name)
+                    if name:
+                        yield name, tar_ref.extractfile(member)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"上传的文件不是有效的{self.label}") from e
+
+
+class TarGzArchive(TarArchive):
+    """tar.gz格式"""
+    
+    suffix = ".tar.gz"
+    label = "tar.gz文件"
+
+    def open_stream(self, fileobj: BinaryIO) -> BinaryIO:
+        import gzip
+        
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+
+
+class TarZstArchive(TarArchive):
+    """tar.zst格式，优先使用标准库compression.zstd（Python 3.14+），否则使用可选依赖zstandard"""
+    
+    suffix = ".tar.zst"
+    label = "tar.zst文件"
+
+    def available(self) -> bool:
+        try:
+            from compression import zstd  # noqa: F401
+            return True
+        except ImportError:
+            pass
+        try:
+            import zstandard  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def open_stream(self, fileobj: BinaryIO) -> BinaryIO:
+        try:
+            from compression import zstd
+            
+            return zstd.ZstdFile(fileobj, mode="rb")
+        except ImportError:
+            import zstandard
+            
+            return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+
+ARCHIVES: List[Archive] = [ZipArchive(), TarGzArchive(), TarZstArchive()]
+
+
+def supported_archives() -> List[Archive]:
+    """
+    当前环境支持的压缩包格式
+    
+    Returns:
+        压缩包格式列表
+    """
+    return [archive for archive in ARCHIVES if archive.available()]
+
+
+def get_archive(filename: str) -> Optional[Archive]:
+    """
+    根据文件名获取压缩包格式
+    
+    Args:
+        filename: 文件名或存储键名
+    
+    Returns:
+        压缩包格式，不支持时返回None
+    """
+    for archive in supported_archives():
+        if filename.endswith(archive.suffix):
+            return archive
+    return None
@@ -1,126 +1,293 @@
 import json
-import os
+import logging
 import shutil
-import traceback
-import zipfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import BinaryIO, Iterator, Optional, Tuple
 
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 
-from app.core.config import settings
+from app.core.logging_config import log_stage
 from app.models.schemas import ProjectMetadata
+from app.services.image_service import optimize_project_images
+from app.services.preload_service import collect_preload_manifest
+from app.services.storage import DATA_AREA, TMP_AREA, get_storage
+from app.utils.archive_utils import Archive, get_archive
+from app.utils.project_utils import MANIFEST_DIR, invalidate_project_manifests
 
+# 配置日志
+logger = logging.getLogger(__name__)
 
-async def save_upload_file(upload_file: UploadFile, temp_filename: str) -> Path:
+# 流式写入存储时每次读取的字节数
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _temp_key(temp_path: str) -> str:
+    """
+    将令牌中记录的临时文件路径转换为存储键名（兼容旧版本记录的完整本地路径）
+    
+    Args:
+        temp_path: 令牌中的临时文件路径或键名
+    
+    Returns:
+        临时文件的存储键名
+    """
+    return Path(temp_path).name
+
+
+class _TeeReader:
+    """读取源文件的同时将读到的数据写入目标文件，用于在一次读取中同时完成保存和验证"""
+    
+    def __init__(self, source: BinaryIO, sink: BinaryIO):
+        self.source = source
+        self.sink = sink
+    
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        if data:
+            self.sink.write(data)
+        return data
+
+
+async def save_upload_file(upload_file: UploadFile, temp_filename: str, archive: Archive) -> str:
     """
-    保存上传的文件到临时目录
+    保存上传的文件到临时存储
     
     Args:
         upload_file: 上传的文件对象
         temp_filename: 临时文件名（不包含扩展名）
+        archive: 压缩包格式
+    
+    Returns:
+        保存的文件在存储中的键名
+    """
+    temp_key = f"{temp_filename}{archive.suffix}"
+    
+    def copy() -> None:
+        upload_file.file.seek(0)
+        with get_storage().open_writer(TMP_AREA, temp_key) as buffer:
+            shutil.copyfileobj(upload_file.file, buffer, COPY_CHUNK_SIZE)
+    
+    # 写入文件（S3存储下为分片流式上传）
+    await run_in_threadpool(copy)
+    
+    return temp_key
+
+
+async def save_and_validate_upload(
+    upload_file: UploadFile,
+    temp_filename: str,
+    archive: Archive
+) -> Tuple[str, bool, str, Optional[ProjectMetadata]]:
+    """
+    保存并验证上传的压缩包
+    
+    支持流式读取的格式（tar.gz、tar.zst）在写入临时存储的同一次读取中完成解压验证；
+    ZIP需要随机访问中央目录，先完整保存再验证。
+    
+    Args:
+        upload_file: 上传的文件对象
+        temp_filename: 临时文件名（不包含扩展名）
+        archive: 压缩包格式
+    
+    Returns:
+        (临时文件键名, 是否有效, 错误消息, 元数据对象)
+    """
+    if not archive.streaming:
+        with log_stage("save"):
+            temp_key = await save_upload_file(upload_file, temp_filename, archive)
+        with log_stage("validate"):
+            is_valid, message, metadata = await run_in_threadpool(validate_archive_file, temp_key)
+        return temp_key, is_valid, message, metadata
+    
+    temp_key = f"{temp_filename}{archive.suffix}"
+    
+    def copy_and_validate() -> Tuple[bool, str, Optional[ProjectMetadata]]:
+        upload_file.file.seek(0)
+        with get_storage().open_writer(TMP_AREA, temp_key) as buffer:
+            reader = _TeeReader(upload_file.file, buffer)
+            result = _validate_members(archive, reader, temp_key)
+            # 读取剩余数据（如tar结尾的填充块），保证临时文件完整
+            while reader.read(COPY_CHUNK_SIZE):
+                pass
+        return result
+    
+    with log_stage("save_validate"):
+        is_valid, message, metadata = await run_in_threadpool(copy_and_validate)
+    return temp_key, is_valid, message, metadata
+
+
+def validate_archive_file(temp_path: str) -> Tuple[bool, str, Optional[ProjectMetadata]]:
+    """
+    验证临时存储中的压缩包是否包含必要的文件结构
+    
+    Args:
+        temp_path: 压缩包在存储中的键名
     
     Returns:
-        保存的文件路径
+        验证结果元组 (是否有效, 错误消息, 元数据对象)
     """
-    temp_file_path = settings.DATA_TMP_DIR / f"{temp_filename}.zip"
+    temp_key = _temp_key(temp_path)
+    archive = get_archive(temp_key)
+    if archive is None:
+        return False, "不支持的压缩包格式", None
     
-    # 确保目录存在
-    temp_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with _open_archive_source(archive, temp_key) as fileobj:
+        return _validate_members(archive, fileobj, temp_key)
+
+
+@contextmanager
+def _open_archive_source(archive: Archive, temp_key: str) -> Iterator[BinaryIO]:
+    """
+    打开临时存储中的压缩包：流式格式直接顺序读取，ZIP使用可随机访问的本地文件
     
-    # 写入文件
-    with open(temp_file_path, "wb") as buffer:
-        content = await upload_file.read()
-        buffer.write(content)
+    Args:
+        archive: 压缩包格式
+        temp_key: 临时文件键名
     
-    return temp_file_path
+    Returns:
+        可读的文件对象
+    """
+    storage = get_storage()
+    if archive.streaming:
+        with storage.open_reader(TMP_AREA, temp_key) as fileobj:
+            yield fileobj
+    else:
+        with storage.local_copy(TMP_AREA, temp_key) as file_path, open(file_path, "rb") as fileobj:
+            yield fileobj
 
 
-def validate_zip_file(file_path: Path) -> Tuple[bool, str, Optional[ProjectMetadata]]:
+def _validate_members(archive: Archive, fileobj: BinaryIO, temp_key: str) -> Tuple[bool, str, Optional[ProjectMetadata]]:
     """
-    验证ZIP文件是否包含必要的文件结构
+    遍历压缩包成员，检查必要文件并校验meta.json
     
     Args:
-        file_path: ZIP文件路径
+        archive: 压缩包格式
+        fileobj: 压缩包数据
+        temp_key: 临时文件键名，用于日志
     
     Returns:
         验证结果元组 (是否有效, 错误消息, 元数据对象)
     """
-    if not zipfile.is_zipfile(file_path):
-        return False, "上传的文件不是有效的ZIP文件", None
+    file_list = set()
+    meta_content = None
+    try:
+        for name, member in archive.iter_members(fileobj):
+            file_list.add(name)
+            if name == "meta.json":
+                meta_content = member.read()
+    except ValueError as e:
+        return False, str(e), None
+    
+    # 检查是否包含index.html
+    if "index.html" not in file_list:
+        return False, f"{archive.label}必须包含index.html文件", None
+    
+    # 检查是否包含meta.json
+    if meta_content is None:
+        return False, f"{archive.label}必须包含meta.json文件", None
+    
+    # 读取并解析meta.json
+    try:
+        meta_data = json.loads(meta_content)
+    except Exception as e:
+        logger.exception(f"解析meta.json失败: {temp_key}")
+        return False, f"meta.json格式无效: {str(e)}", None
+    
+    return _validate_metadata(meta_data, temp_key)
+
+
+def _validate_metadata(meta_data: dict, temp_key: str) -> Tuple[bool, str, Optional[ProjectMetadata]]:
+    """
+    校验meta.json内容
     
-    with zipfile.ZipFile(file_path, 'r') as zip_ref:
-        file_list = zip_ref.namelist()
+    Args:
+        meta_data: meta.json解析后的字典
+        temp_key: 临时文件键名，用于日志
+    
+    Returns:
+        验证结果元组 (是否有效, 错误消息, 元数据对象)
+    """
+    try:
+        # 验证必要字段
+        if "author" not in meta_data:
+            return False, "meta.json必须包含author字段", None
         
-        # 检查是否包含index.html
-        if "index.html" not in file_list:
-            return False, "ZIP文件必须包含index.html文件", None
+        if "email" not in meta_data:
+            return False, "meta.json必须包含email字段", None
         
-        # 检查是否包含meta.json
-        if "meta.json" not in file_list:
-            return False, "ZIP文件必须包含meta.json文件", None
+        # 解析为ProjectMetadata对象（同时校验项目名称是安全的单个路径段）
+        project_metadata = ProjectMetadata(**meta_data)
         
-        # 读取并解析meta.json
-        try:
-            with zip_ref.open("meta.json") as meta_file:
-                meta_data = json.load(meta_file)
-                
-                # 验证必要字段
-                if "author" not in meta_data:
-                    return False, "meta.json必须包含author字段", None
-                
-                if "email" not in meta_data:
-                    return False, "meta.json必须包含email字段", None
-                
-                # 验证项目名称不存在
-                project_dir = settings.DATA_DIR / file_path.name
-                if project_dir.exists():
-                    old_meta = json.loads(project_dir.joinpath("meta.json").read_text(encoding="utf-8"))
-                    if old_meta["author"] != meta_data["author"] and old_meta["email"] != meta_data["email"]:
-                        return False, f"项目名称 '{meta_data['project']}' 已存在", None
-                
-                # 解析为ProjectMetadata对象
-                project_metadata = ProjectMetadata(**meta_data)
-                return True, "验证成功", project_metadata
-        except Exception as e:
-            print(e, traceback.format_exc())
-            return False, f"meta.json格式无效: {str(e)}", None
-
-
-def deploy_project(temp_path: Path, project_name: str) -> Path:
-    """
-    将验证通过的项目部署到正式目录
+        # 验证项目名称不存在
+        project_name = project_metadata.project
+        old_meta_content = get_storage().read_bytes(DATA_AREA, f"{project_name}/meta.json")
+        if old_meta_content is not None:
+            old_meta = json.loads(old_meta_content)
+            if old_meta["author"] != meta_data["author"] and old_meta["email"] != meta_data["email"]:
+                return False, f"项目名称 '{project_name}' 已存在", None
+        
+        return True, "验证成功", project_metadata
+    except Exception as e:
+        logger.exception(f"解析meta.json失败: {temp_key}")
+        return False, f"meta.json格式无效: {str(e)}", None
+
+
+def deploy_project(temp_path: str, project_name: str) -> str:
+    """
+    将验证通过的项目部署到正式存储
     
     Args:
-        temp_path: 临时文件路径
+        temp_path: 临时文件在存储中的键名
         project_name: 项目名称
     
     Returns:
-        部署后的项目路径
+        部署后的项目键名
     """
-    # 创建项目目录
-    project_dir = settings.DATA_DIR / project_name
+    storage = get_storage()
+    temp_key = _temp_key(temp_path)
+    archive = get_archive(temp_key)
+    if archive is None:
+        raise ValueError(f"不支持的压缩包格式: {temp_key}")
     
-    # 如果目录已存在，先删除
-    if project_dir.exists():
-        shutil.rmtree(project_dir)
+    # 如果项目已存在，先删除
+    storage.delete_tree(DATA_AREA, project_name)
     
-    # 创建项目目录
-    project_dir.mkdir(parents=True, exist_ok=True)
+    # 解压文件到项目目录（流式格式一次顺序读取完成解压，S3存储下并行上传）
+    # 压缩包中与项目清单同名的文件会被忽略，清单只能由部署流程生成
+    with _open_archive_source(archive, temp_key) as fileobj:
+        files = (
+            (name, member.read())
+            for name, member in archive.iter_members(fileobj)
+            if not name.startswith(f"{MANIFEST_DIR}/")
+        )
+        # 生成HTML入口页面的预加载清单
+        files = collect_preload_manifest(files, project_name)
+        # 可选的图片优化阶段
+        files = optimize_project_images(files, project_name)
+        storage.put_tree(DATA_AREA, project_name, files)
     
-    # 解压文件到项目目录
-    with zipfile.ZipFile(temp_path, 'r') as zip_ref:
-        zip_ref.extractall(project_dir)
-    
-    return project_dir
+    invalidate_project_manifests(project_name)
+    return project_name
 
 
-def clean_temp_files(temp_path: Path) -> None:
+def clean_temp_files(temp_path: str) -> None:
     """
     清理临时文件
     
     Args:
-        temp_path: 临时文件路径
+        temp_path: 临时文件在存储中的键名
+    """
+    get_storage().delete(TMP_AREA, _temp_key(temp_path))
+
+
+def delete_project_files(project_name: str) -> None:
+    """
+    删除已部署项目的所有文件
+    
+    Args:
+        project_name: 项目名称
     """
-    if temp_path.exists():
-        os.remove(temp_path) 
\ No newline at end of file
+    get_storage().delete_tree(DATA_AREA, project_name)
+    invalidate_project_manifests(project_name)
@@ -0,0 +1,135 @@
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.services.storage import DATA_AREA, get_storage
+
+# 项目元数据文件，记录 邮箱 -> 项目名称 的映射
+PROJECT_META_FILE = "projects.json"
+
+# 部署时生成的项目清单目录（位于项目目录内，不对外提供访问）
+MANIFEST_DIR = ".share"
+
+# 项目清单缓存，键为 (项目名称, 清单名称)，值为 (清单版本, 清单内容)
+# 每次读取时与存储中的清单版本比较，其他工作进程或副本重新部署后不会读到旧清单
+# 项目名称来自请求路径，只缓存存在的清单并限制条目数，避免任意路径使缓存无限增长
+_MANIFEST_CACHE_SIZE = 1024
+_manifest_cache: "OrderedDict[Tuple[str, str], Tuple[str, dict]]" = OrderedDict()
+
+
+def project_meta_exists() -> bool:
+    """
+    判断项目元数据文件是否存在
+    
+    Returns:
+        是否存在
+    """
+    return get_storage().exists(DATA_AREA, PROJECT_META_FILE)
+
+
+def load_project_meta() -> Dict[str, str]:
+    """
+    读取项目元数据
+    
+    Returns:
+        元数据字典，键为邮箱，值为项目名称
+    
+    Raises:
+        json.JSONDecodeError: 元数据文件格式错误
+    """
+    content = get_storage().read_bytes(DATA_AREA, PROJECT_META_FILE)
+    if content is None:
+        return {}
+    return json.loads(content)
+
+
+def update_project_meta(update: Callable[[Dict[str, str]], bool]) -> None:
+    """
+    原子地修改项目元数据，多个工作进程或副本同时修改时不会丢失更新
+    
+    Args:
+        update: 就地修改元数据字典（键为邮箱，值为项目名称）并返回是否有改动；
+            发生并发冲突时会以最新内容重新调用
+    
+    Raises:
+        json.JSONDecodeError: 元数据文件格式错误
+    """
+    def apply(content: Optional[bytes]) -> Optional[bytes]:
+        project_meta_data = json.loads(content) if content is not None else {}
+        if not update(project_meta_data):
+            return None
+        return json.dumps(project_meta_data, ensure_ascii=False, indent=4).encode("utf-8")
+    
+    get_storage().update_bytes(DATA_AREA, PROJECT_META_FILE, apply)
+
+
+def manifest_key(name: str) -> str:
+    """
+    项目清单在项目目录中的相对路径
+    
+    Args:
+        name: 清单名称
+    
+    Returns:
+        相对路径
+    """
+    return f"{MANIFEST_DIR}/{name}.json"
+
+
+def load_project_manifest(project_name: str, name: str) -> Optional[dict]:
+    """
+    读取部署时生成的项目清单
+    
+    清单按版本缓存（最多_MANIFEST_CACHE_SIZE个，按最近使用淘汰），存储中的清单版本未变化时
+    只需一次元数据查询（本地为stat，S3为HEAD请求），不再重新读取和解析清单内容。
+    
+    Args:
+        project_name: 项目名称
+        name: 清单名称
+    
+    Returns:
+        清单内容，不存在时返回None
+    """
+    cache_key = (project_name, name)
+    storage = get_storage()
+    key = f"{project_name}/{manifest_key(name)}"
+    try:
+        version = storage.version(DATA_AREA, key)
+    except ValueError:
+        version = None
+    if version is None:
+        _manifest_cache.pop(cache_key, None)
+        return None
+    
+    cached = _manifest_cache.get(cache_key)
+    if cached is not None and cached[0] == version:
+        _manifest_cache.move_to_end(cache_key)
+        return cached[1]
+    
+    # 读取期间清单可能再次被覆盖，此时缓存的版本比内容旧，下次读取会因版本不一致而重新加载
+    try:
+        content = storage.read_bytes(DATA_AREA, key)
+        manifest = json.loads(content) if content is not None else None
+    except (ValueError, json.JSONDecodeError):
+        manifest = None
+    
+    if manifest is None:
+        _manifest_cache.pop(cache_key, None)
+        return None
+    _manifest_cache[cache_key] = (version, manifest)
+    _manifest_cache.move_to_end(cache_key)
+    while len(_manifest_cache) > _MANIFEST_CACHE_SIZE:
+        _manifest_cache.popitem(last=False)
+    return manifest
+
+
+def invalidate_project_manifests(project_name: str) -> None:
+    """
+    清除当前进程中的项目清单缓存，在重新部署或删除项目后调用以尽早释放内存
+    （其他进程中的缓存会在下次读取时因版本不一致而失效）
+    
+    Args:
+        project_name: 项目名称
+    """
+    for cache_key in [key for key in _manifest_cache if key[0] == project_name]:
+        _manifest_cache.pop(cache_key, None)
@@ -1,13 +1,13 @@
 import json
 import secrets
 from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 
 from pydantic import EmailStr
 
 from app.core.config import settings
 from app.models.schemas import VerificationToken
+from app.services.storage import TMP_AREA, get_storage
 
 
 def generate_token() -> str:
@@ -20,13 +20,13 @@ def generate_token() -> str:
     return secrets.token_urlsafe(32)
 
 
-def create_verification_token(project_name: str, temp_path: Path) -> VerificationToken:
+def create_verification_token(project_name: str, temp_path: str) -> VerificationToken:
     """
     创建验证令牌
     
     Args:
         project_name: 项目名称
-        temp_path: 临时文件路径
+        temp_path: 临时文件在存储中的键名
     
     Returns:
         验证令牌对象
@@ -37,7 +37,7 @@ def create_verification_token(project_name: str, temp_path: Path) -> Verificatio
     verification_token = VerificationToken(
         token=token,
         project_name=project_name,
-        temp_path=str(temp_path),
+        temp_path=temp_path,
         expires_at=expires_at,
         email=None
     )
@@ -45,6 +45,45 @@ def create_verification_token(project_name: str, temp_path: Path) -> Verificatio
     return verification_token
 
 
+def _parse_tokens(content: Optional[bytes]) -> Dict[str, dict]:
+    """
+    解析令牌缓存内容
+    
+    Args:
+        content: 缓存文件内容，不存在时为None
+    
+    Returns:
+        令牌字典，键为令牌值，值为令牌数据
+    
+    Raises:
+        json.JSONDecodeError: 缓存文件已损坏。不能当作空缓存处理，否则下一次写入会清空所有待验证的令牌
+    """
+    if content is None:
+        return {}
+    return json.loads(content)
+
+
+def _update_tokens(update: Callable[[Dict[str, dict]], bool]) -> None:
+    """
+    原子地修改令牌缓存，多个工作进程或副本同时修改时不会丢失更新
+    
+    Args:
+        update: 就地修改令牌字典并返回是否有改动；发生并发冲突时会以最新内容重新调用
+    """
+    def apply(content: Optional[bytes]) -> Optional[bytes]:
+        tokens = _parse_tokens(content)
+        if not update(tokens):
+            return None
+        return json.dumps(tokens, default=str).encode("utf-8")
+    
+    get_storage().update_bytes(TMP_AREA, settings.VERIFICATION_CACHE_FILE, apply)
+
+
+def _is_expired(token_data: dict, current_time: datetime) -> bool:
+    """判断令牌是否已过期"""
+    return datetime.fromisoformat(str(token_data["expires_at"])) <= current_time
+
+
 def save_verification_token(token: VerificationToken) -> None:
     """
     保存验证令牌到缓存文件
@@ -52,17 +91,11 @@ def save_verification_token(token: VerificationToken) -> None:
     Args:
         token: 验证令牌对象
     """
-    cache_file = settings.DATA_TMP_DIR / settings.VERIFICATION_CACHE_FILE
-    
-    # 读取现有缓存
-    tokens = load_verification_tokens()
-    
-    # 添加新令牌
-    tokens[token.token] = token.model_dump()
+    def add(tokens: Dict[str, dict]) -> bool:
+        tokens[token.token] = token.model_dump()
+        return True
     
-    # 写入缓存文件
-    with open(cache_file, "w") as f:
-        json.dump(tokens, f, default=str)
+    _update_tokens(add)
 
 
 def load_verification_tokens() -> Dict[str, dict]:
@@ -71,17 +104,11 @@ def load_verification_tokens() -> Dict[str, dict]:
     
     Returns:
         令牌字典，键为令牌值，值为令牌数据
-    """
-    cache_file = settings.DATA_TMP_DIR / settings.VERIFICATION_CACHE_FILE
-    
-    if not cache_file.exists():
-        return {}
     
-    try:
-        with open(cache_file, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+    Raises:
+        json.JSONDecodeError: 缓存文件已损坏
+    """
+    return _parse_tokens(get_storage().read_bytes(TMP_AREA, settings.VERIFICATION_CACHE_FILE))
 
 
 def get_verification_token(token: str) -> Optional[VerificationToken]:
@@ -117,34 +144,21 @@ def remove_verification_token(token: str) -> None:
     Args:
         token: 令牌字符串
     """
-    tokens = load_verification_tokens()
-    
-    if token in tokens:
-        del tokens[token]
-        
-        cache_file = settings.DATA_TMP_DIR / settings.VERIFICATION_CACHE_FILE
-        with open(cache_file, "w") as f:
-            json.dump(tokens, f, default=str)
+    _update_tokens(lambda tokens: tokens.pop(token, None) is not None)
 
 
 def clean_expired_tokens() -> None:
     """
     清理过期的验证令牌
     """
-    tokens = load_verification_tokens()
-    current_time = datetime.now()
-    
-    # 过滤出未过期的令牌
-    valid_tokens = {}
-    for token, token_data in tokens.items():
-        expires_at = datetime.fromisoformat(str(token_data["expires_at"]))
-        if expires_at > current_time:
-            valid_tokens[token] = token_data
+    def drop_expired(tokens: Dict[str, dict]) -> bool:
+        current_time = datetime.now()
+        expired = [token for token, token_data in tokens.items() if _is_expired(token_data, current_time)]
+        for token in expired:
+            del tokens[token]
+        return bool(expired)
     
-    # 更新缓存文件
-    cache_file = settings.DATA_TMP_DIR / settings.VERIFICATION_CACHE_FILE
-    with open(cache_file, "w") as f:
-        json.dump(valid_tokens, f, default=str)
+    _update_tokens(drop_expired)
 
 
 def update_token_email(token: str, email: EmailStr) -> bool:
@@ -158,20 +172,15 @@ def update_token_email(token: str, email: EmailStr) -> bool:
     Returns:
         更新是否成功
     """
-    verification_token = get_verification_token(token)
-    
-    if not verification_token:
-        return False
-    
-    # 更新邮箱
-    verification_token.email = email
-    
-    # 保存更新后的令牌
-    tokens = load_verification_tokens()
-    tokens[token] = verification_token.model_dump()
+    updated = False
     
-    cache_file = settings.DATA_TMP_DIR / settings.VERIFICATION_CACHE_FILE
-    with open(cache_file, "w") as f:
-        json.dump(tokens, f, default=str)
+    def set_email(tokens: Dict[str, dict]) -> bool:
+        nonlocal updated
+        token_data = tokens.get(token)
+        updated = token_data is not None and not _is_expired(token_data, datetime.now())
+        if updated:
+            token_data["email"] = email
+        return updated
     
-    return True 
\ No newline at end of file
+    _update_tokens(set_email)
+    return updated
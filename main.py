@@ -1,22 +1,38 @@
 import logging
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import router
+from app.api.static_routes import router as static_router
 from app.core.config import ensure_directories, settings
+from app.core.logging_config import RequestContextMiddleware, setup_logging
+from app.services.image_service import shutdown_image_pool
+from app.services.warmup_service import warm_up
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # 确保必要的目录存在
 ensure_directories()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：启动时预热共享状态，关闭时释放图片处理进程池
+
+    多进程启动时每个工作进程各执行一次。
+    """
+    await run_in_threadpool(warm_up)
+    yield
+    shutdown_image_pool()
+
+
 # 创建FastAPI应用
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -25,6 +41,7 @@ app = FastAPI(
     # 只在DEBUG模式下启用API文档
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    lifespan=lifespan,
 )
 
 # 配置CORS
@@ -36,6 +53,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求ID与耗时日志
+app.add_middleware(RequestContextMiddleware)
+
 # 包含API路由
 app.include_router(router)
 
@@ -51,5 +71,10 @@ async def root():
     }
 
 
+# 已部署项目的静态文件路由匹配任意路径，必须最后注册
+app.include_router(static_router)
+
+
+# 本地开发启动（热重载）；生产环境使用 python -m app.core.server
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run("main:app", host=settings.HOST, port=settings.PORT, reload=True) 
\ No newline at end of file
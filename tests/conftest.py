@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.services.storage import DATA_AREA, TMP_AREA, LocalStorage, S3Storage, get_storage
+
+
+@pytest.fixture(scope="session")
+def s3_endpoint():
+    """进程内启动moto S3服务，作为MinIO等S3兼容服务的替身"""
+    pytest.importorskip("boto3")
+    server_module = pytest.importorskip("moto.server")
+    server = server_module.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "DATA_TMP_DIR", tmp_path / "data-tmp")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    get_storage.cache_clear()
+    yield LocalStorage({DATA_AREA: settings.DATA_DIR, TMP_AREA: settings.DATA_TMP_DIR})
+    get_storage.cache_clear()
+
+
+@pytest.fixture
+def s3_storage(s3_endpoint, monkeypatch):
+    import boto3
+    
+    bucket = f"share-{uuid.uuid4().hex[:12]}"
+    for name, value in {
+        "STORAGE_BACKEND": "s3",
+        "S3_BUCKET": bucket,
+        "S3_ENDPOINT_URL": s3_endpoint,
+        "S3_REGION": "us-east-1",
+        "S3_ACCESS_KEY_ID": "testing",
+        "S3_SECRET_ACCESS_KEY": "testing",
+        # S3要求除最后一片外的分片不小于5MB
+        "S3_MULTIPART_CHUNK_SIZE": 5 * 1024 * 1024,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    boto3.client(
+        "s3",
+        endpoint_url=s3_endpoint,
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    ).create_bucket(Bucket=bucket)
+    get_storage.cache_clear()
+    yield S3Storage()
+    get_storage.cache_clear()
+
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request):
+    """依次使用本地存储和S3存储运行测试"""
+    return request.getfixturevalue(f"{request.param}_storage")
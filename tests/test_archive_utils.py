@@ -0,0 +1,104 @@
+import gzip
+import io
+import tarfile
+import zipfile
+from typing import Dict
+
+import pytest
+
+from app.core.config import settings
+from app.utils.archive_utils import TarGzArchive, TarZstArchive, ZipArchive, get_archive, safe_member_name
+
+FILES = {"index.html": b"<html></html>", "meta.json": b"{}", "css/style.css": b"body{}"}
+
+
+def _zip(files: Dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_ref:
+        for name, data in files.items():
+            zip_ref.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _tar(files: Dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar_ref:
+        directory = tarfile.TarInfo("css")
+        directory.type = tarfile.DIRTYPE
+        tar_ref.addfile(directory)
+        link = tarfile.TarInfo("link.html")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "/etc/passwd"
+        tar_ref.addfile(link)
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar_ref.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _tar_gz(files: Dict[str, bytes]) -> bytes:
+    return gzip.compress(_tar(files))
+
+
+def _tar_zst(files: Dict[str, bytes]) -> bytes:
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(_tar(files))
+
+
+ARCHIVES = [(ZipArchive(), _zip), (TarGzArchive(), _tar_gz), (TarZstArchive(), _tar_zst)]
+
+
+def _members(archive, data: bytes) -> Dict[str, bytes]:
+    return {name: member.read() for name, member in archive.iter_members(io.BytesIO(data))}
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("index.html", "index.html"),
+    ("./css/style.css", "css/style.css"),
+    ("/etc/passwd", "etc/passwd"),
+    ("../../evil.txt", "evil.txt"),
+    ("sub/../../evil.txt", "sub/evil.txt"),
+    ("dir\\..\\file.txt", "dir/file.txt"),
+    ("..", None),
+    ("./", None),
+])
+def test_safe_member_name(name, expected):
+    assert safe_member_name(name) == expected
+
+
+@pytest.mark.parametrize("filename, suffix", [("a.zip", ".zip"), ("a.tar.gz", ".tar.gz"), ("a.tar.zst", ".tar.zst"), ("a.rar", None)])
+def test_get_archive(filename, suffix):
+    archive = get_archive(filename)
+    if suffix == ".tar.zst" and not TarZstArchive().available():
+        pytest.skip("当前环境不支持tar.zst")
+    assert (archive.suffix if archive else None) == suffix
+
+
+@pytest.mark.parametrize("archive, build", ARCHIVES)
+def test_iter_members(archive, build):
+    assert _members(archive, build(FILES)) == FILES
+
+
+@pytest.mark.parametrize("archive, build", ARCHIVES)
+def test_member_paths_are_sanitised(archive, build):
+    members = _members(archive, build({"../../evil.txt": b"x", "/abs/path.txt": b"y", "./index.html": b"z"}))
+    
+    assert members == {"evil.txt": b"x", "abs/path.txt": b"y", "index.html": b"z"}
+
+
+@pytest.mark.parametrize("archive, build", ARCHIVES)
+def test_extracted_size_limit(archive, build, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_EXTRACTED_SIZE", 1024)
+    data = build({"index.html": b"a" * 600, "big.bin": b"b" * 600})
+    
+    with pytest.raises(ValueError, match="解压后的文件大小超过限制"):
+        _members(archive, data)
+
+
+@pytest.mark.parametrize("archive, build", ARCHIVES)
+def test_invalid_archive(archive, build):
+    if archive.suffix == ".tar.zst":
+        pytest.importorskip("zstandard")
+    with pytest.raises(ValueError, match="不是有效的"):
+        _members(archive, b"not an archive" * 100)
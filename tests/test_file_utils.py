@@ -0,0 +1,60 @@
+import gzip
+import io
+import json
+import tarfile
+
+import pytest
+
+from app.services.storage import DATA_AREA
+from app.utils.archive_utils import TarGzArchive, TarZstArchive
+from app.utils.file_utils import _validate_members, _validate_metadata
+
+META = json.dumps({"author": "me", "email": "a@b.com", "project": "demo"}).encode()
+
+
+def _tar(files) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar_ref:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar_ref.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _compress(archive, data: bytes) -> bytes:
+    if isinstance(archive, TarZstArchive):
+        return pytest.importorskip("zstandard").ZstdCompressor().compress(data)
+    return gzip.compress(data)
+
+
+@pytest.mark.parametrize("archive", [TarGzArchive(), TarZstArchive()], ids=["tar.gz", "tar.zst"])
+def test_validate_streaming_archives(local_storage, archive):
+    data = _compress(archive, _tar({"index.html": b"<html></html>", "meta.json": META}))
+    
+    is_valid, _, metadata = _validate_members(archive, io.BytesIO(data), "temp_1")
+    assert is_valid and metadata.project == "demo"
+    
+    data = _compress(archive, _tar({"meta.json": META}))
+    is_valid, message, _ = _validate_members(archive, io.BytesIO(data), "temp_1")
+    assert not is_valid and "index.html" in message
+    
+    is_valid, message, _ = _validate_members(archive, io.BytesIO(b"garbage" * 100), "temp_1")
+    assert not is_valid and "不是有效的" in message
+
+
+@pytest.mark.parametrize("project", [".", "..", ".share", "a/b", "./demo", "demo/..", "", "a b"])
+def test_rejects_unsafe_project_names(local_storage, project):
+    local_storage.write_bytes(DATA_AREA, "projects.json", b"{}")
+    
+    is_valid, message, metadata = _validate_metadata({"author": "me", "email": "a@b.com", "project": project}, "temp_1.zip")
+    
+    assert not is_valid and metadata is None
+    assert local_storage.read_bytes(DATA_AREA, "projects.json") == b"{}"
+
+
+@pytest.mark.parametrize("project", ["demo", "my-project", "v1.2", "项目"])
+def test_accepts_project_names(local_storage, project):
+    is_valid, _, metadata = _validate_metadata({"author": "me", "email": "a@b.com", "project": project}, "temp_1.zip")
+    
+    assert is_valid and metadata.project == project
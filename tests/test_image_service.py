@@ -0,0 +1,109 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.config import settings
+from app.services import image_service
+from app.services.image_service import IMAGE_MANIFEST, negotiate_variant, optimize_project_images
+from app.utils.project_utils import manifest_key
+
+BROWSER_ACCEPT = "image/avif,image/webp,image/apng,image/*,*/*;q=0.8"
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    pytest.importorskip("PIL")
+    monkeypatch.setattr(settings, "IMAGE_OPTIMIZATION", True)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        monkeypatch.setattr(image_service, "_get_pool", lambda: pool)
+        yield pool
+
+
+def test_variants_are_ordered_by_size(thread_pool, monkeypatch):
+    # 调色板PNG：无损WebP远小于有损AVIF
+    monkeypatch.setattr(image_service, "process_image", lambda *args: (None, {"avif": b"a" * 492, "webp": b"w" * 40}))
+    
+    files = dict(optimize_project_images(iter([("logo.png", b"p" * 1000), ("index.html", b"<html>")]), "demo"))
+    manifest = json.loads(files[manifest_key(IMAGE_MANIFEST)])
+    
+    assert manifest["variants"] == {"logo.png": ["webp", "avif"]}
+    assert manifest["stats"]["served_bytes"] == 40
+    assert negotiate_variant(BROWSER_ACCEPT, manifest["variants"]["logo.png"]) == "webp"
+    assert files["logo.png.webp"] == b"w" * 40 and files["index.html"] == b"<html>"
+
+
+@pytest.mark.parametrize("accept, available, expected", [
+    (BROWSER_ACCEPT, ["webp", "avif"], "webp"),
+    (BROWSER_ACCEPT, ["avif", "webp"], "avif"),
+    ("image/webp,*/*", ["avif", "webp"], "webp"),
+    ("image/avif;q=0,image/webp", ["avif", "webp"], "webp"),
+    ("image/avif; q=0.00, image/webp;q=0.5", ["avif", "webp"], "webp"),
+    ("image/avif;level=1;q=0", ["avif"], None),
+    ("image/avif;q=0.1", ["avif"], "avif"),
+    ("image/avif;q=abc", ["avif"], "avif"),
+    ("IMAGE/WEBP", ["webp"], "webp"),
+    ("*/*", ["avif", "webp"], None),
+    ("", ["webp"], None),
+])
+def test_negotiate_variant(accept, available, expected):
+    assert negotiate_variant(accept, available) == expected
+
+
+def _image_bytes(image, fmt: str, **params) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def test_process_png_keeps_only_smaller_variants():
+    Image = pytest.importorskip("PIL.Image")
+    data = _image_bytes(Image.new("RGB", (256, 256), (200, 30, 30)), "PNG", compress_level=0)
+    
+    optimized, variants = image_service.process_image("logo.png", data, False, 80, 60)
+    
+    assert optimized is not None and len(optimized) < len(data)
+    assert set(variants) == {"webp"}
+    assert len(variants["webp"]) < len(optimized)
+    with Image.open(io.BytesIO(variants["webp"])) as variant:
+        assert variant.size == (256, 256) and variant.getpixel((0, 0))[:3] == (200, 30, 30)
+
+
+def test_process_jpeg_keeps_exif_and_icc():
+    Image = pytest.importorskip("PIL.Image")
+    from PIL import ImageCms
+    
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation
+    icc_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    image = Image.effect_noise((512, 512), 64).convert("RGB")
+    data = _image_bytes(image, "JPEG", quality=95, exif=exif.tobytes(), icc_profile=icc_profile)
+    
+    _, variants = image_service.process_image("photo.jpg", data, False, 50, 60)
+    
+    with Image.open(io.BytesIO(variants["webp"])) as variant:
+        assert variant.getexif()[0x0112] == 6
+        assert variant.info.get("icc_profile") == icc_profile
+
+
+def test_process_image_skips_16bit_and_animated_png():
+    Image = pytest.importorskip("PIL.Image")
+    sixteen_bit = _image_bytes(Image.new("I;16", (32, 32), 1000), "PNG")
+    frames = [Image.new("RGB", (32, 32), color) for color in ("red", "blue")]
+    animated = _image_bytes(frames[0], "PNG", save_all=True, append_images=frames[1:])
+    
+    assert image_service.process_image("deep.png", sixteen_bit, True, 80, 60) == (None, {})
+    assert image_service.process_image("anim.png", animated, True, 80, 60) == (None, {})
+
+
+def test_process_image_generates_avif_when_supported():
+    Image = pytest.importorskip("PIL.Image")
+    Image.init()
+    if "AVIF" not in Image.SAVE:
+        pytest.skip("Pillow未启用AVIF支持")
+    data = _image_bytes(Image.effect_noise((256, 256), 64).convert("RGB"), "JPEG", quality=98)
+    
+    _, variants = image_service.process_image("photo.jpg", data, True, 80, 40)
+    
+    assert "avif" in variants and len(variants["avif"]) < len(data)
@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+
+from app.services.preload_service import build_preload_manifest, collect_preload_manifest, format_link_header
+from app.services.storage import DATA_AREA
+from main import app
+
+PAGE = """<html><head>
+<link rel="stylesheet" href="css/s.css?v=版本">
+<link rel="stylesheet" href="s.css?v=a%20b&x=1">
+<link rel="preload" as="font" type="font/woff2" href="fonts/a b.woff2" crossorigin>
+<link rel="preload" as="image" type="图片/png" href="logo.png?x=<y>">
+<script type="module" src="app.js"></script>
+<script async src="ignored.js"></script>
+<link rel="stylesheet" href="https://cdn.example.com/x.css">
+</head><body><script src="body.js"></script></body></html>"""
+
+
+def _links(project_name: str = "demo") -> list:
+    return build_preload_manifest({"index.html": PAGE.encode()}, {}, project_name)["pages"]["index.html"]
+
+
+def test_build_preload_manifest():
+    assert _links() == [
+        {"as": "style", "href": "/demo/css/s.css?v=%E7%89%88%E6%9C%AC"},
+        {"as": "style", "href": "/demo/s.css?v=a%20b&x=1"},
+        {"as": "font", "type": "font/woff2", "crossorigin": True, "href": "/demo/fonts/a%20b.woff2"},
+        {"as": "image", "href": "/demo/logo.png?x=%3Cy%3E"},
+        {"rel": "modulepreload", "href": "/demo/app.js"},
+    ]
+
+
+def test_build_preload_manifest_encodes_unicode_project_names():
+    assert _links("项目")[0]["href"] == "/%E9%A1%B9%E7%9B%AE/css/s.css?v=%E7%89%88%E6%9C%AC"
+
+
+def test_format_link_header():
+    headers = [format_link_header(resource) for resource in _links()]
+    
+    assert headers == [
+        "</demo/css/s.css?v=%E7%89%88%E6%9C%AC>; rel=preload; as=style",
+        "</demo/s.css?v=a%20b&x=1>; rel=preload; as=style",
+        '</demo/fonts/a%20b.woff2>; rel=preload; as=font; type="font/woff2"; crossorigin',
+        "</demo/logo.png?x=%3Cy%3E>; rel=preload; as=image",
+        "</demo/app.js>; rel=modulepreload",
+    ]
+    for header in headers:
+        header.encode("latin-1")
+
+
+def test_format_link_header_encodes_legacy_manifests():
+    assert format_link_header({"href": "/demo/s.css?v=版本&w=%20", "as": "style"}) == "</demo/s.css?v=%E7%89%88%E6%9C%AC&w=%20>; rel=preload; as=style"
+
+
+def test_page_with_unicode_query_is_served(local_storage):
+    files = list(collect_preload_manifest(iter([("index.html", PAGE.encode()), ("css/s.css", b"body{}")]), "demo"))
+    local_storage.put_tree(DATA_AREA, "demo", files)
+    
+    response = TestClient(app).get("/demo/")
+    
+    assert response.status_code == 200
+    assert "</demo/css/s.css?v=%E7%89%88%E6%9C%AC>" in response.headers["link"]
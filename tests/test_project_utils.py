@@ -0,0 +1,23 @@
+import json
+
+from app.services.storage import DATA_AREA
+from app.utils.project_utils import load_project_manifest, manifest_key
+
+
+def test_manifest_cache_follows_redeploys(storage):
+    key = f"demo/{manifest_key('images')}"
+    assert load_project_manifest("demo", "images") is None
+    
+    storage.write_bytes(DATA_AREA, key, json.dumps({"variants": {"a.png": []}}).encode())
+    assert load_project_manifest("demo", "images") == {"variants": {"a.png": []}}
+    
+    # 模拟其他工作进程重新部署，不经过当前进程的invalidate_project_manifests
+    storage.write_bytes(DATA_AREA, key, json.dumps({"variants": {}, "stats": {"images": 0}}).encode())
+    assert load_project_manifest("demo", "images") == {"variants": {}, "stats": {"images": 0}}
+    
+    storage.delete_tree(DATA_AREA, "demo")
+    assert load_project_manifest("demo", "images") is None
+
+
+def test_manifest_rejects_escaping_project_names(local_storage):
+    assert load_project_manifest("..", "images") is None
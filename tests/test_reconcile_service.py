@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models.schemas import ReconcileResponse
+from app.services.reconcile_service import (
+    acquire_reconcile_lease,
+    reclaim_storage,
+    reconcile_running,
+    release_reconcile_lease,
+    renew_reconcile_lease,
+    run_reconcile,
+    scan_storage,
+)
+from app.services.storage import DATA_AREA, TMP_AREA
+from app.utils.project_utils import load_project_meta
+from app.utils.token_utils import load_verification_tokens
+
+
+def _age(storage, area: str, name: str) -> None:
+    """将条目的修改时间改到回收宽限期之前"""
+    path = storage.get_local_path(area, name)
+    past = time.time() - settings.RECONCILE_GRACE_SECONDS - 60
+    os.utime(path, (past, past))
+
+
+def _token(temp_name: str, expires_in: timedelta) -> dict:
+    return {
+        "token": temp_name,
+        "project_name": "kept",
+        "temp_path": temp_name,
+        "expires_at": (datetime.now() + expires_in).isoformat(),
+        "email": "a@b.com",
+    }
+
+
+@pytest.fixture
+def populated(local_storage, monkeypatch):
+    monkeypatch.setattr(settings, "RECONCILE_BATCH_INTERVAL", 0)
+    for project in ("kept", "orphan", "fresh"):
+        local_storage.put_tree(DATA_AREA, project, [("index.html", project.encode())])
+    local_storage.write_bytes(DATA_AREA, "projects.json", json.dumps({"a@b.com": "kept", "c@d.com": "missing"}).encode())
+    for temp_name in ("temp_live.zip", "temp_orphan.zip", "temp_new.zip"):
+        local_storage.write_bytes(TMP_AREA, temp_name, b"zip")
+    tokens = {
+        "live": _token("temp_live.zip", timedelta(minutes=5)),
+        "expired": _token("temp_live.zip", timedelta(minutes=-5)),
+        "lost": _token("temp_lost.zip", timedelta(minutes=5)),
+    }
+    local_storage.write_bytes(TMP_AREA, settings.VERIFICATION_CACHE_FILE, json.dumps(tokens).encode())
+    for area, name in [(DATA_AREA, "kept"), (DATA_AREA, "orphan"), (TMP_AREA, "temp_live.zip"), (TMP_AREA, "temp_orphan.zip")]:
+        _age(local_storage, area, name)
+    return local_storage
+
+
+def test_scan_classifies_entries(populated):
+    report = scan_storage()
+    
+    assert report.dry_run
+    assert report.orphan_projects == ["orphan"]
+    assert report.orphan_temp_files == ["temp_orphan.zip"]
+    assert sorted(report.stale_tokens) == ["expired", "lost"]
+    assert report.dangling_entries == ["c@d.com"]
+    assert report.reclaimable_bytes == len(b"orphan") + len(b"zip")
+
+
+def test_reclaim_skips_entries_changed_after_scan(populated):
+    report = scan_storage()
+    # 扫描之后孤立项目被重新部署，但尚未登记到项目元数据
+    populated.delete_tree(DATA_AREA, "orphan")
+    populated.put_tree(DATA_AREA, "orphan", [("index.html", b"redeployed")])
+    owner = acquire_reconcile_lease()
+    
+    reclaimed = asyncio.run(reclaim_storage(report, owner))
+    
+    assert reclaimed == 1
+    assert populated.read_bytes(DATA_AREA, "orphan/index.html") == b"redeployed"
+    assert not populated.exists(TMP_AREA, "temp_orphan.zip")
+    assert populated.exists(TMP_AREA, "temp_live.zip")
+    assert list(load_verification_tokens()) == ["live"]
+    assert load_project_meta() == {"a@b.com": "kept"}
+
+
+def test_reclaim_stops_when_lease_is_lost(populated):
+    report = scan_storage()
+    owner = acquire_reconcile_lease()
+    release_reconcile_lease(owner)
+    
+    assert asyncio.run(reclaim_storage(report, owner)) == 0
+    assert populated.exists(DATA_AREA, "orphan")
+    assert len(load_verification_tokens()) == 3
+
+
+def test_lease_is_exclusive(storage):
+    owner = acquire_reconcile_lease()
+    
+    assert owner is not None
+    assert reconcile_running()
+    assert acquire_reconcile_lease() is None
+    assert renew_reconcile_lease(owner)
+    
+    release_reconcile_lease(owner)
+    assert not reconcile_running()
+    assert not renew_reconcile_lease(owner)
+    assert acquire_reconcile_lease() is not None
+
+
+def test_expired_lease_can_be_taken_over(storage, monkeypatch):
+    monkeypatch.setattr(settings, "RECONCILE_LEASE_SECONDS", -1)
+    stale_owner = acquire_reconcile_lease()
+    monkeypatch.setattr(settings, "RECONCILE_LEASE_SECONDS", 300)
+    
+    owner = acquire_reconcile_lease()
+    assert owner is not None and owner != stale_owner
+    # 原持有者不能续期或释放已被接管的租约
+    assert not renew_reconcile_lease(stale_owner)
+    release_reconcile_lease(stale_owner)
+    assert reconcile_running()
+
+
+def test_run_reconcile_releases_lease(local_storage):
+    owner = acquire_reconcile_lease()
+    
+    asyncio.run(run_reconcile(ReconcileResponse(dry_run=False), owner))
+    
+    assert not reconcile_running()
@@ -0,0 +1,62 @@
+import io
+import json
+import zipfile
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.api.routes as routes
+from app.core.config import settings
+from app.services.storage import TMP_AREA, get_storage
+from app.utils.token_utils import load_verification_tokens
+from main import app
+
+
+def _archive(project: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_ref:
+        zip_ref.writestr("meta.json", json.dumps({"author": "me", "email": "a@b.com", "project": project}))
+        zip_ref.writestr("index.html", f"<html>{project}</html>")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(local_storage, monkeypatch):
+    async def send_verification_email(*args):
+        return True
+    
+    monkeypatch.setattr(routes, "send_verification_email", send_verification_email)
+    return TestClient(app)
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 1, 1, 12, 0, 0)
+
+
+def test_uploads_in_the_same_second_get_distinct_temp_files(client, monkeypatch):
+    monkeypatch.setattr(routes, "datetime", _FrozenDatetime)
+    
+    for project in ("first", "second"):
+        response = client.post("/upload/", files={"file": ("p.zip", _archive(project), "application/zip")})
+        assert response.json()["success"]
+    
+    tokens = load_verification_tokens()
+    temp_paths = {token_data["temp_path"] for token_data in tokens.values()}
+    assert len(temp_paths) == 2
+    
+    for token, token_data in tokens.items():
+        assert client.get(f"/verify/{token}").json()["success"]
+        assert client.get(f"/{token_data['project_name']}/").text == f"<html>{token_data['project_name']}</html>"
+
+
+def test_corrupt_token_cache_returns_error_responses(client):
+    get_storage().write_bytes(TMP_AREA, settings.VERIFICATION_CACHE_FILE, b'{"tok')
+    
+    upload = client.post("/upload/", files={"file": ("p.zip", _archive("demo"), "application/zip")})
+    assert upload.status_code == 200 and not upload.json()["success"]
+    
+    verify = client.get("/verify/missing")
+    assert verify.status_code == 200 and not verify.json()["success"]
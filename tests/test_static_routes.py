@@ -0,0 +1,33 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.storage import DATA_AREA
+from main import app
+
+
+@pytest.fixture
+def client(storage):
+    storage.write_bytes(DATA_AREA, "projects.json", b'{"a@b.com": "demo"}')
+    storage.put_tree(DATA_AREA, "demo", [("index.html", b"<html>demo</html>"), (".share/images.json", b'{"variants": {}}')])
+    return TestClient(app)
+
+
+def test_serves_project_files(client):
+    assert client.get("/demo/").text == "<html>demo</html>"
+    assert client.get("/demo/index.html").text == "<html>demo</html>"
+
+
+@pytest.mark.parametrize("path", [
+    "/%2e/projects.json",
+    "/%2e%2e/data/projects.json",
+    "/.share/projects.json",
+    "/demo/%2e/.share/images.json",
+    "/%2e/demo/.share/images.json",
+    "/demo/.share/images.json",
+    "/demo//.share/images.json",
+])
+def test_does_not_expose_registry_or_manifests(client, path):
+    response = client.get(path)
+    
+    assert response.status_code == 404
+    assert b"a@b.com" not in response.content and b"variants" not in response.content
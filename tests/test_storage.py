@@ -0,0 +1,139 @@
+import json
+import threading
+
+import pytest
+
+from app.services.storage import DATA_AREA, TMP_AREA, S3Storage
+
+
+def test_read_write_roundtrip(storage):
+    assert storage.read_bytes(DATA_AREA, "projects.json") is None
+    assert not storage.exists(DATA_AREA, "projects.json")
+    
+    storage.write_bytes(DATA_AREA, "projects.json", b"{}")
+    assert storage.read_bytes(DATA_AREA, "projects.json") == b"{}"
+    assert storage.exists(DATA_AREA, "projects.json")
+    
+    storage.delete(DATA_AREA, "projects.json")
+    assert storage.read_bytes(DATA_AREA, "projects.json") is None
+    storage.delete(DATA_AREA, "projects.json")
+
+
+@pytest.mark.parametrize("key", ["../secret", "/etc/passwd", ".", "./projects.json", "demo/./index.html", "demo//index.html", "demo/", ""])
+def test_rejects_unsafe_keys(storage, key):
+    storage.write_bytes(DATA_AREA, "projects.json", b"{}")
+    
+    with pytest.raises(ValueError):
+        storage.read_bytes(DATA_AREA, key)
+    with pytest.raises(ValueError):
+        storage.write_bytes(DATA_AREA, key, b"")
+    with pytest.raises(ValueError):
+        storage.delete_tree(DATA_AREA, key)
+    assert storage.read_bytes(DATA_AREA, "projects.json") == b"{}"
+
+
+def test_streaming_write_spans_multiple_parts(storage):
+    data = bytes(range(256)) * (11 * 1024 * 1024 // 256)
+    with storage.open_writer(TMP_AREA, "temp_1.zip") as writer:
+        for start in range(0, len(data), 1024 * 1024):
+            writer.write(data[start:start + 1024 * 1024])
+    
+    with storage.open_reader(TMP_AREA, "temp_1.zip") as reader:
+        assert reader.read() == data
+    with storage.local_copy(TMP_AREA, "temp_1.zip") as path:
+        assert path.read_bytes() == data
+    assert storage.entry_size(TMP_AREA, "temp_1.zip") == len(data)
+
+
+def test_tree_operations(storage):
+    storage.put_tree(DATA_AREA, "demo", [("index.html", b"<html>"), ("css/style.css", b"body{}")])
+    storage.write_bytes(DATA_AREA, "projects.json", b"{}")
+    
+    entries = {entry.name: entry.is_dir for entry in storage.list_entries(DATA_AREA)}
+    assert entries == {"demo": True, "projects.json": False}
+    assert storage.read_bytes(DATA_AREA, "demo/css/style.css") == b"body{}"
+    assert storage.entry_size(DATA_AREA, "demo") == len(b"<html>") + len(b"body{}")
+    
+    storage.delete_tree(DATA_AREA, "demo")
+    assert [entry.name for entry in storage.list_entries(DATA_AREA)] == ["projects.json"]
+
+
+def test_internal_entries_are_not_listed(storage):
+    storage.update_bytes(TMP_AREA, "verification_cache.json", lambda content: b"{}")
+    storage.write_bytes(TMP_AREA, ".lease", b"{}")
+    
+    assert [entry.name for entry in storage.list_entries(TMP_AREA)] == ["verification_cache.json"]
+
+
+def test_update_bytes(storage):
+    def append(content):
+        items = json.loads(content) if content is not None else []
+        return json.dumps(items + [len(items)]).encode()
+    
+    assert storage.update_bytes(DATA_AREA, "items.json", append) == b"[0]"
+    assert storage.update_bytes(DATA_AREA, "items.json", append) == b"[0, 1]"
+    # 返回None时不写入，返回当前内容
+    assert storage.update_bytes(DATA_AREA, "items.json", lambda content: None) == b"[0, 1]"
+    assert storage.update_bytes(DATA_AREA, "missing.json", lambda content: None) is None
+    assert not storage.exists(DATA_AREA, "missing.json")
+
+
+def test_concurrent_updates_are_not_lost(storage):
+    def increment(content):
+        return str(int(content or b"0") + 1).encode()
+    
+    def worker():
+        for _ in range(20):
+            storage.update_bytes(TMP_AREA, "counter", increment)
+    
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert storage.read_bytes(TMP_AREA, "counter") == b"80"
+
+
+def test_s3_update_retries_after_conflicting_write(s3_storage: S3Storage):
+    s3_storage.write_bytes(DATA_AREA, "projects.json", b'{"a@b.com": "a"}')
+    calls = []
+    
+    def register(content):
+        calls.append(content)
+        if len(calls) == 1:
+            # 模拟另一个副本在读取和写入之间修改了对象
+            s3_storage.write_bytes(DATA_AREA, "projects.json", b'{"c@d.com": "c"}')
+        data = json.loads(content)
+        data["e@f.com"] = "e"
+        return json.dumps(data).encode()
+    
+    s3_storage.update_bytes(DATA_AREA, "projects.json", register)
+    
+    assert len(calls) == 2
+    assert json.loads(s3_storage.read_bytes(DATA_AREA, "projects.json")) == {"c@d.com": "c", "e@f.com": "e"}
+
+
+def test_version_changes_when_object_is_overwritten(storage):
+    assert storage.version(DATA_AREA, "demo/.share/images.json") is None
+    
+    storage.write_bytes(DATA_AREA, "demo/.share/images.json", b"{}")
+    first = storage.version(DATA_AREA, "demo/.share/images.json")
+    assert first is not None
+    assert storage.version(DATA_AREA, "demo/.share/images.json") == first
+    
+    storage.write_bytes(DATA_AREA, "demo/.share/images.json", b'{"variants": {}}')
+    assert storage.version(DATA_AREA, "demo/.share/images.json") != first
+
+
+def test_s3_failed_completion_aborts_multipart_upload(s3_storage: S3Storage, monkeypatch):
+    def fail(**kwargs):
+        raise RuntimeError("complete failed")
+    
+    monkeypatch.setattr(s3_storage.client, "complete_multipart_upload", fail)
+    with pytest.raises(RuntimeError):
+        with s3_storage.open_writer(TMP_AREA, "temp_1.zip") as writer:
+            writer.write(b"x" * (6 * 1024 * 1024))
+    
+    assert not s3_storage.client.list_multipart_uploads(Bucket=s3_storage.bucket).get("Uploads")
+    assert not s3_storage.exists(TMP_AREA, "temp_1.zip")
@@ -0,0 +1,59 @@
+import json
+import multiprocessing
+
+import pytest
+
+from app.core.config import settings
+from app.services.storage import TMP_AREA
+from app.utils.token_utils import (
+    clean_expired_tokens,
+    create_verification_token,
+    get_verification_token,
+    load_verification_tokens,
+    save_verification_token,
+    update_token_email,
+)
+
+
+def _save_tokens(data_dir: str, tmp_dir: str, worker: int, count: int) -> None:
+    from pathlib import Path
+    
+    settings.DATA_DIR = Path(data_dir)
+    settings.DATA_TMP_DIR = Path(tmp_dir)
+    for index in range(count):
+        clean_expired_tokens()
+        save_verification_token(create_verification_token(f"project-{worker}-{index}", f"temp_{worker}_{index}.zip"))
+
+
+def test_token_lifecycle(local_storage):
+    token = create_verification_token("demo", "temp_1.zip")
+    save_verification_token(token)
+    
+    assert update_token_email(token.token, "a@b.com")
+    assert get_verification_token(token.token).email == "a@b.com"
+    assert not update_token_email("missing", "a@b.com")
+
+
+def test_corrupt_cache_is_not_treated_as_empty(local_storage):
+    local_storage.write_bytes(TMP_AREA, settings.VERIFICATION_CACHE_FILE, b'{"tok')
+    
+    with pytest.raises(json.JSONDecodeError):
+        load_verification_tokens()
+    with pytest.raises(json.JSONDecodeError):
+        save_verification_token(create_verification_token("demo", "temp_1.zip"))
+    assert local_storage.read_bytes(TMP_AREA, settings.VERIFICATION_CACHE_FILE) == b'{"tok'
+
+
+def test_tokens_survive_concurrent_workers(local_storage):
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_save_tokens, args=(str(settings.DATA_DIR), str(settings.DATA_TMP_DIR), worker, 50))
+        for worker in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    
+    assert [process.exitcode for process in processes] == [0] * 4
+    assert len(load_verification_tokens()) == 200